@@ -0,0 +1,416 @@
+"""按键到声音热路径的基准测试
+
+使用 SDL 的 dummy 音频驱动，在无声卡、无显示器的 Linux 上也能运行。
+直接调用 SoundPlayer.on_keyboard_press / on_keyboard_release 注入合成按键事件，
+不安装真实的键盘钩子。
+
+用法：
+    python benchmarks/bench_hot_path.py                 # 运行并与基线比较
+    python benchmarks/bench_hot_path.py --save-baseline # 运行并保存为新的基线
+"""
+import argparse
+import gc
+import json
+import math
+import os
+import shutil
+import statistics
+import struct
+import sys
+import tempfile
+import time
+import tracemalloc
+import wave
+from array import array
+from pathlib import Path
+
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+
+BENCH_DIR = Path(__file__).parent
+PROJECT_ROOT = BENCH_DIR.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from src.core.events import EventBus  # noqa: E402
+from src.core.sound_player import SoundPlayer  # noqa: E402
+from src.core.replay import read_log, replay  # noqa: E402
+
+try:
+    import resource
+except ImportError:     # Windows 下没有 resource 模块
+    resource = None
+
+BASELINE_PATH = BENCH_DIR / 'baseline.json'
+KEYS = [chr(c) for c in range(ord('A'), ord('Z') + 1)]
+# 合成事件的扫描码，每个按键各不相同
+SCAN_CODES = {key: index + 1 for index, key in enumerate(KEYS)}
+
+# 与基线比较的指标：(名称, 越大越好)；p99 抖动太大，只输出不比较
+COMPARED_METRICS = (
+    ('events_per_sec', True),
+    ('dispatch_p50_ms', False),
+    ('dispatch_p95_ms', False),
+    ('peak_alloc_bytes_per_event', False),
+)
+# 延迟指标在亚毫秒级别时抖动很大，低于该值的差异不计为退化
+LATENCY_FLOOR_MS = 0.5
+# 每个事件的内存分配只有几个字节时，后台线程的零星分配就会造成成倍的波动，低于该值的差异不计为退化
+ALLOC_FLOOR_BYTES = 16
+# 预先分配的延迟样本数，超出后循环覆盖最早的样本
+LATENCY_SAMPLES = 1 << 16
+
+
+class SyntheticEvent:
+    """模拟 keyboard.KeyboardEvent 的最小字段"""
+    __slots__ = ('event_type', 'scan_code', 'name', 'time')
+
+    def __init__(self, event_type, scan_code, name):
+        self.event_type = event_type
+        self.scan_code = scan_code
+        self.name = name
+        self.time = time.time()
+
+
+def make_wav(path, frequency, duration=0.15, rate=22050):
+    """生成一个正弦波测试音频"""
+    frames = int(rate * duration)
+    data = b''.join(
+        struct.pack('<h', int(8000 * math.sin(2 * math.pi * frequency * i / rate)))
+        for i in range(frames)
+    )
+    with wave.open(str(path), 'wb') as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(rate)
+        f.writeframes(data)
+
+
+def make_workspace():
+    """创建临时工作目录，包含测试音频和两个场景的配置"""
+    workdir = Path(tempfile.mkdtemp(prefix='lemon_bench_'))
+    scenes = {}
+    for scene_index in (1, 2):
+        key_sounds = {}
+        for key_index, key in enumerate(KEYS):
+            path = workdir / f"s{scene_index}_{key}.wav"
+            make_wav(path, 220 + 20 * key_index + 5 * scene_index)
+            key_sounds[key] = str(path)
+        scenes[f"scene_{scene_index}"] = {'name': f"场景{scene_index}", 'key_sounds': key_sounds}
+
+    config = {
+        'current_scene': 'scene_1',
+        'scenes': scenes,
+        'stop_key': 'ESC',
+        'stop_on_unbound': True,
+        'long_press_optimize': True,
+        'event_queue_size': 1024,
+    }
+    with open(workdir / 'config.json', 'w', encoding='utf-8') as f:
+        json.dump(config, f, ensure_ascii=False)
+    return workdir
+
+
+class Harness:
+    """驱动 SoundPlayer 的测试夹具
+
+    scan_codes 为 True 时按合成事件的扫描码构建扫描码表，按键通过扫描码解析；
+    否则扫描码表为空，所有事件按名称处理。
+    """
+
+    def __init__(self, scan_codes=False):
+        self.player = SoundPlayer(EventBus())
+        self.wait_loaded()
+        if scan_codes:
+            self.player.key_table.load(SCAN_CODES)
+        # 延迟样本写入预先分配的数组，记录本身不在计时区间内分配内存
+        self.dispatch_latencies = array('d', bytes(8 * LATENCY_SAMPLES))
+        self.latency_count = 0
+
+        # 包装分发处理函数，记录每个事件从入队到开始处理的时间
+        handler = self.player.dispatch_key_event
+        latencies = self.dispatch_latencies
+
+        def timed_handler(timestamp, is_press, event):
+            latencies[self.latency_count % LATENCY_SAMPLES] = time.perf_counter() - timestamp
+            self.latency_count += 1
+            handler(timestamp, is_press, event)
+
+        self.player.dispatcher.handler = timed_handler
+        self.player.is_running = True
+        self.player.dispatcher.start()
+
+    def wait_loaded(self, timeout=30.0):
+        """等待当前场景加载完成，以及相邻场景的后台预取结束，预取的内存分配不计入测量"""
+        deadline = time.monotonic() + timeout
+        while not self.player.sound_loader.is_idle():
+            if time.monotonic() > deadline:
+                raise RuntimeError("音频加载超时")
+            time.sleep(0.005)
+
+    def press(self, name):
+        self.player.on_keyboard_press(SyntheticEvent('down', SCAN_CODES.get(name, 0), name.lower()))
+
+    def release(self, name):
+        self.player.on_keyboard_release(SyntheticEvent('up', SCAN_CODES.get(name, 0), name.lower()))
+
+    def get_latencies(self):
+        """已记录的延迟样本（升序）"""
+        return sorted(self.dispatch_latencies[:min(self.latency_count, LATENCY_SAMPLES)])
+
+    def wait_drained(self, timeout=30.0):
+        """等待分发线程处理完所有已入队的事件"""
+        queue = self.player.event_queue
+        deadline = time.monotonic() + timeout
+        while self.player.dispatcher.dispatched < queue.enqueued:
+            if time.monotonic() > deadline:
+                raise RuntimeError("等待分发超时")
+            time.sleep(0.0005)
+
+    def close(self):
+        self.player.is_running = False
+        self.player.dispatcher.stop()
+        self.player.shutdown()
+
+
+def scenario_steady(harness):
+    """稳定打字：每 2 毫秒一个事件，依次按下并松开不同的按键"""
+    interval = 0.002
+    next_time = time.perf_counter()
+    for i in range(1000):
+        key = KEYS[i % len(KEYS)]
+        for send in (harness.press, harness.release):
+            next_time += interval
+            while time.perf_counter() < next_time:
+                time.sleep(0.0002)
+            send(key)
+
+
+def scenario_scan_code(harness):
+    """扫描码解析：与稳定打字相同的负载，但按键名称通过扫描码表取得"""
+    scenario_steady(harness)
+
+
+def scenario_burst(harness):
+    """20 键连击：同时按下 20 个键再全部松开，每轮之间等待处理完毕"""
+    for _ in range(50):
+        burst = KEYS[:20]
+        for key in burst:
+            harness.press(key)
+        for key in burst:
+            harness.release(key)
+        harness.wait_drained()
+
+
+def scenario_repeat_storm(harness):
+    """按键自动重复：按住同一个键产生大量重复的按下事件"""
+    for _ in range(4):
+        for _ in range(500):
+            harness.press('A')
+        harness.release('A')
+        harness.wait_drained()
+
+
+def scenario_scene_switch(harness):
+    """快速切换场景：每按 10 个键切换一次场景"""
+    scenes = list(harness.player.scenes)
+    for i in range(1000):
+        if i % 10 == 0:
+            harness.player.switch_scene(scenes[(i // 10) % len(scenes)])
+        key = KEYS[i % len(KEYS)]
+        harness.press(key)
+        harness.release(key)
+
+
+def make_trace_scenario(path):
+    """以最快速度回放 main.py --record 录制的真实按键会话"""
+    events = read_log(path)
+
+    def scenario_trace(harness):
+        replay(harness.player, events, speed=0)
+    return scenario_trace
+
+
+SCENARIOS = {
+    'steady_typing': scenario_steady,
+    'burst_20': scenario_burst,
+    'repeat_storm': scenario_repeat_storm,
+    'scene_switch': scenario_scene_switch,
+    'scan_code_typing': scenario_scan_code,
+}
+# 构建扫描码表运行的场景，其余场景的按键按事件名称解析
+SCAN_CODE_SCENARIOS = frozenset(['scan_code_typing'])
+
+
+def percentile_ms(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(fraction * len(sorted_values)))
+    return sorted_values[rank - 1] * 1000
+
+
+def run_scenario(name, scenario):
+    """运行一个场景并返回指标"""
+    harness = Harness(scan_codes=name in SCAN_CODE_SCENARIOS)
+    try:
+        queue = harness.player.event_queue
+        gc.collect()
+        blocks_before = sys.getallocatedblocks()
+        tracemalloc.start()
+        tracemalloc.reset_peak()
+        traced_before, _ = tracemalloc.get_traced_memory()
+
+        started = time.perf_counter()
+        scenario(harness)
+        harness.wait_drained()
+        elapsed = time.perf_counter() - started
+
+        _, traced_peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        gc.collect()
+        blocks_after = sys.getallocatedblocks()
+
+        input_stats = harness.player.get_input_stats()
+        suppressed = input_stats['suppressed_repeats'] + input_stats['suppressed_retriggers']
+        events = queue.enqueued + queue.dropped + suppressed
+        latencies = harness.get_latencies()
+        return {
+            'events': events,
+            'dropped': queue.dropped,
+            'suppressed': suppressed,
+            'scan_code_hits': harness.player.key_table.resolved,
+            'events_per_sec': round(events / elapsed, 1),
+            'dispatch_p50_ms': round(percentile_ms(latencies, 0.50), 4),
+            'dispatch_p95_ms': round(percentile_ms(latencies, 0.95), 4),
+            'dispatch_p99_ms': round(percentile_ms(latencies, 0.99), 4),
+            'peak_alloc_bytes_per_event': round((traced_peak - traced_before) / max(1, events), 1),
+            'retained_blocks_per_event': round((blocks_after - blocks_before) / max(1, events), 3),
+        }
+    finally:
+        harness.close()
+
+
+def run_repeated(name, scenario, repeat):
+    """多次运行同一场景，每项指标取中位数以减小抖动"""
+    runs = [run_scenario(name, scenario) for _ in range(repeat)]
+    return {metric: statistics.median(run[metric] for run in runs) for metric in runs[0]}
+
+
+def peak_rss_mb():
+    """进程峰值常驻内存（MB），不支持的平台返回 None"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 下单位为 KB，macOS 下为字节
+    if sys.platform == 'darwin':
+        return round(peak / (1024 * 1024), 1)
+    return round(peak / 1024, 1)
+
+
+def compare(results, baseline, tolerance, latency_tolerance):
+    """与基线比较，返回退化项列表"""
+    regressions = []
+    for name, metrics in results['scenarios'].items():
+        base = baseline.get('scenarios', {}).get(name)
+        if not base:
+            continue
+        for metric, higher_is_better in COMPARED_METRICS:
+            if metric not in base:
+                continue
+            current = metrics[metric]
+            expected = base[metric]
+            if metric.endswith('_ms'):
+                limit = max(expected * (1 + latency_tolerance), expected + LATENCY_FLOOR_MS)
+                if current > limit:
+                    regressions.append(f"{name}.{metric}: {current} > {limit:.4f}（基线 {expected}）")
+            elif metric == 'peak_alloc_bytes_per_event':
+                limit = max(expected * (1 + tolerance), expected + ALLOC_FLOOR_BYTES)
+                if current > limit:
+                    regressions.append(f"{name}.{metric}: {current} > {limit:.1f}（基线 {expected}）")
+            elif higher_is_better:
+                limit = expected * (1 - tolerance)
+                if current < limit:
+                    regressions.append(f"{name}.{metric}: {current} < {limit:.1f}（基线 {expected}）")
+            else:
+                limit = expected * (1 + tolerance)
+                if current > limit:
+                    regressions.append(f"{name}.{metric}: {current} > {limit:.1f}（基线 {expected}）")
+        # 基线没有丢弃事件时，任何丢弃都算退化
+        if metrics['dropped'] > base.get('dropped', 0):
+            regressions.append(f"{name}.dropped: {metrics['dropped']}（基线 {base.get('dropped', 0)}）")
+    return regressions
+
+
+def print_results(results):
+    columns = ('events_per_sec', 'dispatch_p50_ms', 'dispatch_p95_ms', 'dispatch_p99_ms',
+               'peak_alloc_bytes_per_event', 'retained_blocks_per_event', 'dropped', 'suppressed',
+               'scan_code_hits')
+    print(f"{'scenario':<16}" + ''.join(f"{c:>28}" for c in columns))
+    for name, metrics in results['scenarios'].items():
+        print(f"{name:<16}" + ''.join(f"{metrics[c]:>28}" for c in columns))
+    print(f"peak_rss_mb: {results['peak_rss_mb']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="按键到声音热路径基准测试")
+    parser.add_argument('--save-baseline', action='store_true', help="把本次结果保存为基线")
+    parser.add_argument('--baseline', default=str(BASELINE_PATH), help="基线文件路径")
+    parser.add_argument('--tolerance', type=float, default=0.50,
+                        help="允许的退化比例，默认 0.50（50%%）")
+    parser.add_argument('--latency-tolerance', type=float, default=1.0,
+                        help="延迟指标允许的退化比例，默认 1.0（100%%）")
+    parser.add_argument('--repeat', type=int, default=3, help="每个场景的运行次数，取中位数")
+    parser.add_argument('--scenario', action='append', choices=sorted(SCENARIOS),
+                        help="只运行指定场景，可重复")
+    parser.add_argument('--trace', action='append', default=[],
+                        help="把录制的按键会话作为额外的测试场景，可重复")
+    parser.add_argument('--output', help="把结果写入 JSON 文件")
+    args = parser.parse_args()
+
+    scenarios = dict(SCENARIOS)
+    for path in args.trace:
+        scenarios[f"trace:{Path(path).stem}"] = make_trace_scenario(path)
+
+    workdir = make_workspace()
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        names = args.scenario or list(scenarios)
+        if args.scenario:
+            names += [name for name in scenarios if name.startswith('trace:')]
+        results = {'scenarios': {}}
+        for name in names:
+            results['scenarios'][name] = run_repeated(name, scenarios[name], max(1, args.repeat))
+        results['peak_rss_mb'] = peak_rss_mb()
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print_results(results)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=4)
+
+    if args.save_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=4)
+        print(f"已保存基线: {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"未找到基线文件 {args.baseline}，使用 --save-baseline 生成")
+        return 0
+
+    with open(args.baseline, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+    regressions = compare(results, baseline, args.tolerance, args.latency_tolerance)
+    if regressions:
+        print("\n性能退化！")
+        for line in regressions:
+            print(f"  {line}")
+        return 1
+    print("\n与基线相比没有发现性能退化")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
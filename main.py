@@ -1,3 +1,7 @@
+import time
+_started = time.perf_counter()
+
+import argparse
 import sys
 from pathlib import Path
 
@@ -5,8 +9,69 @@ from pathlib import Path
 project_root = Path(__file__).parent
 sys.path.append(str(project_root))
 
-from src.gui.main_window import GUI
+from src.utils.logger import LOG_LEVELS, setup_logging
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="柠檬键音助手")
+    parser.add_argument('--headless', action='store_true',
+                        help="无界面模式，直接按 config.json 监听按键并播放音效")
+    parser.add_argument('--profile-startup', action='store_true',
+                        help="输出启动过程中各阶段的耗时")
+    parser.add_argument('--log-level', default='warning', choices=LOG_LEVELS,
+                        help="日志级别，默认只输出警告和错误")
+    parser.add_argument('--record', metavar='FILE',
+                        help="把本次运行中的所有按键事件录制到文件")
+    parser.add_argument('--replay', metavar='FILE',
+                        help="回放录制文件并输出延迟统计，不监听键盘、不输出声音")
+    parser.add_argument('--speed', type=float, default=1.0,
+                        help="回放速度倍数，0 表示以最快速度回放，默认 1")
+    return parser.parse_args()
+
+
+def start_recorder(path):
+    """开始录制按键事件"""
+    from src.core.replay import KeyRecorder
+    recorder = KeyRecorder(path)
+    try:
+        recorder.start()
+    except Exception as e:
+        print(f"[错误] 启动按键录制失败: {str(e) or type(e).__name__}", file=sys.stderr)
+        recorder.stop()
+        return None
+    return recorder
+
+
+def stop_recorder(recorder):
+    """停止录制并输出录制的事件数，重复调用时只输出一次"""
+    if recorder.stop():
+        print(f"已录制 {recorder.count} 个按键事件: {recorder.path}")
+
 
 if __name__ == "__main__":
-    app = GUI()
-    app.run()
\ No newline at end of file
+    args = parse_args()
+    setup_logging(args.log_level)
+    from src.utils.startup_profiler import StartupProfiler
+    profiler = StartupProfiler(args.profile_startup, _started)
+
+    if args.replay:
+        from src.core.replay import run_replay
+        sys.exit(run_replay(args.replay, args.speed))
+
+    recorder = start_recorder(args.record) if args.record else None
+    try:
+        if args.headless:
+            # 无界面模式不导入任何 GUI 相关模块
+            with profiler.phase("导入播放器模块"):
+                from src.core.headless import run_headless
+            sys.exit(run_headless(profiler))
+
+        with profiler.phase("导入界面模块"):
+            from src.gui.main_window import GUI
+        # 界面退出时会强制结束进程，不会执行下面的 finally，因此在退出流程中停止录制
+        on_quit = (lambda: stop_recorder(recorder)) if recorder is not None else None
+        app = GUI(profiler, on_quit=on_quit)
+        app.run()
+    finally:
+        if recorder is not None:
+            stop_recorder(recorder)
\ No newline at end of file
@@ -0,0 +1,111 @@
+import json
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+import pygame
+from .sample_cache import sample_cache
+
+AUDIO_EXTENSIONS = ('.wav', '.mp3', '.ogg', '.flac')
+MAPPING_FILE = 'keymap.json'
+# 可以出现在文件名中的多字符按键名称，下划线和连字符视为空格，例如 page_up.wav
+NAMED_KEYS = frozenset(
+    ['SPACE', 'ENTER', 'TAB', 'BACKSPACE', 'ESC', 'CAPS LOCK', 'SHIFT', 'CTRL', 'ALT', 'WINDOWS',
+     'UP', 'DOWN', 'LEFT', 'RIGHT', 'HOME', 'END', 'PAGE UP', 'PAGE DOWN', 'INSERT', 'DELETE',
+     'PRINT SCREEN', 'SCROLL LOCK', 'PAUSE', 'NUM LOCK', 'MENU'] +
+    [f'F{i}' for i in range(1, 25)]
+)
+NAME_SEPARATORS = re.compile(r'[\s_\-]+')
+MAX_KEY_WORDS = 3       # 按键名称最多由几个单词组成
+
+
+def key_from_filename(filename):
+    """按文件名约定得到按键名称，无法识别时返回 None
+
+    文件名（不含扩展名）本身是按键名称，或以按键名称加分隔符开头，
+    例如 a.wav、F1.wav、page_up.wav、A_click.wav、space-hit.mp3。
+    """
+    stem = os.path.splitext(filename)[0]
+    words = [word for word in NAME_SEPARATORS.split(stem.upper()) if word]
+    if not words:
+        return None
+    # 优先匹配最长的多单词名称
+    for count in range(min(MAX_KEY_WORDS, len(words)), 0, -1):
+        name = ' '.join(words[:count])
+        if name in NAMED_KEYS:
+            return name
+    first = words[0]
+    return first if len(first) == 1 else None
+
+
+def plan_folder(folder, stop_key=None):
+    """根据映射文件或文件名约定规划文件夹中的按键绑定
+
+    文件夹中有 keymap.json（{"按键": "文件名"}）时按映射文件绑定，否则按文件名约定。
+    返回 ({按键: 路径}, 问题列表)；不会绑定停止键，多个文件对应同一个按键时使用排序后的第一个。
+    """
+    bindings = {}
+    issues = []
+    mapping_path = os.path.join(folder, MAPPING_FILE)
+    if os.path.isfile(mapping_path):
+        with open(mapping_path, 'r', encoding='utf-8') as f:
+            mapping = json.load(f)
+        if not isinstance(mapping, dict):
+            raise ValueError(f"{MAPPING_FILE} 应为 {{\"按键\": \"文件名\"}} 格式")
+        candidates = []
+        for key, filename in mapping.items():
+            if type(filename) is not str or not filename:
+                issues.append(f"{MAPPING_FILE}: 按键 {key} 的文件名无效")
+                continue
+            path = os.path.join(folder, filename)
+            if not os.path.isfile(path):
+                issues.append(f"{MAPPING_FILE}: 按键 {key} 的文件 {filename} 不存在")
+                continue
+            candidates.append((key.strip().upper(), path))
+    else:
+        candidates = []
+        for filename in sorted(os.listdir(folder)):
+            if not filename.lower().endswith(AUDIO_EXTENSIONS):
+                continue
+            key = key_from_filename(filename)
+            if key is None:
+                issues.append(f"{filename}: 无法从文件名识别按键")
+                continue
+            candidates.append((key, os.path.join(folder, filename)))
+
+    for key, path in candidates:
+        if not key:
+            issues.append(f"{os.path.basename(path)}: 按键名称为空")
+        elif key == stop_key:
+            issues.append(f"{os.path.basename(path)}: 按键 {key} 是停止键，已跳过")
+        elif key in bindings:
+            issues.append(f"{os.path.basename(path)}: 按键 {key} 已对应 {os.path.basename(bindings[key])}，已跳过")
+        else:
+            bindings[key] = os.path.abspath(path)
+    return bindings, issues
+
+
+def decode_all(bindings, max_workers=None):
+    """并行解码并校验所有音频，返回 ({按键: Sound}, 问题列表)
+
+    解码结果放入进程级的音频缓存，提交绑定之后加载场景时直接命中缓存。
+    pygame 解码时释放 GIL，线程池即可利用多个核心。
+    """
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+    sounds = {}
+    issues = []
+
+    def decode(item):
+        key, path = item
+        try:
+            return key, path, sample_cache.get(path), None
+        except (pygame.error, OSError) as e:
+            return key, path, None, str(e)
+
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='BulkImport') as executor:
+        for key, path, sound, error in executor.map(decode, bindings.items()):
+            if sound is None:
+                issues.append(f"{os.path.basename(path)}: 解码失败: {error}")
+            else:
+                sounds[key] = sound
+    return sounds, issues
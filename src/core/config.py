@@ -1,42 +1,112 @@
+import atexit
+import copy
 import json
 import os
+import threading
+import time
+from . import config_schema
+from ..utils.logger import logger
+
+CONFIG_FILE = 'config.json'
 
 class ConfigManager:
     @staticmethod
-    def load_config():
+    def load_config(path=CONFIG_FILE):
+        """读取配置文件，迁移到当前版本并校验，返回 (配置, 问题列表)
+
+        配置文件不存在时返回默认配置；无法解析或无法迁移的配置文件备份为 .broken 后使用默认配置，
+        避免之后的保存覆盖用户原有的配置。
+        """
         try:
-            with open('config.json', 'r', encoding='utf-8') as f:
+            with open(path, 'r', encoding='utf-8') as f:
                 config = json.load(f)
-                # 如果是旧版配置，转换为新格式
-                if 'key_sounds' in config and 'scenes' not in config:
-                    config = {
-                        'current_scene': 'default',
-                        'scenes': {
-                            'default': {
-                                'name': '默认场景',
-                                'key_sounds': config['key_sounds']
-                            }
-                        },
-                        'stop_key': config.get('stop_key', 'SPACE'),
-                        'stop_on_unbound': config.get('stop_on_unbound', True),
-                        'long_press_optimize': config.get('long_press_optimize', True)
-                    }
-                return config
+            return config_schema.load(config)
         except FileNotFoundError:
-            return {
-                'current_scene': 'default',
-                'scenes': {
-                    'default': {
-                        'name': '默认场景',
-                        'key_sounds': {}
-                    }
-                },
-                'stop_key': 'SPACE',
-                'stop_on_unbound': True,
-                'long_press_optimize': True
-            }
+            return config_schema.default_config(), []
+        except ValueError as e:
+            logger.error("读取配置文件失败: %s", e)
+            try:
+                os.replace(path, path + '.broken')
+            except OSError:
+                pass
+            return config_schema.default_config(), [f"配置文件无法使用（{str(e)}），已备份为 {path}.broken 并使用默认配置"]
+
+    @staticmethod
+    def read_config(path):
+        """读取导入的配置文件，迁移并校验，文件无效时抛出异常"""
+        with open(path, 'r', encoding='utf-8') as f:
+            config = json.load(f)
+        return config_schema.load(config)
     
     @staticmethod
     def save_config(config):
-        with open('config.json', 'w', encoding='utf-8') as f:
-            json.dump(config, f, indent=4)
\ No newline at end of file
+        """原子地写入配置：先写入临时文件再替换，写入过程中崩溃不会损坏原配置"""
+        temp_path = CONFIG_FILE + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(config, f, indent=4)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, CONFIG_FILE)
+
+
+class DebouncedConfigSaver:
+    """延迟合并的配置保存器
+
+    短时间内的多次保存请求只会在最后一次请求之后安静 delay 秒时写入一次，
+    写入在后台线程中进行。schedule 时会复制一份配置快照，之后界面线程修改配置不会影响写入。
+    程序退出前需要调用 flush 立即写入尚未保存的配置。
+    """
+
+    def __init__(self, save_func=ConfigManager.save_config, delay=0.5):
+        self.save_func = save_func
+        self.delay = delay
+        self._condition = threading.Condition()
+        self._write_lock = threading.Lock()     # 保证后台写入和 flush 不会同时写文件
+        self._pending = None        # 等待写入的配置快照
+        self._deadline = 0.0        # 最早可以写入的时间
+        self._thread = None
+        self.requests = 0           # 保存请求次数
+        self.writes = 0             # 实际写入次数
+        atexit.register(self.flush)
+
+    def schedule(self, config):
+        """请求保存配置"""
+        snapshot = copy.deepcopy(config)
+        with self._condition:
+            self._pending = snapshot
+            self._deadline = time.monotonic() + self.delay
+            self.requests += 1
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='ConfigSaver', daemon=True)
+                self._thread.start()
+            self._condition.notify()
+
+    def flush(self):
+        """立即写入尚未保存的配置"""
+        with self._write_lock:
+            with self._condition:
+                config = self._pending
+                self._pending = None
+            if config is not None:
+                self._write(config)
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while self._pending is None:
+                    self._condition.wait()
+                # 等待到安静期结束，期间有新的请求会推迟截止时间
+                remaining = self._deadline - time.monotonic()
+                while remaining > 0:
+                    self._condition.wait(remaining)
+                    if self._pending is None:
+                        break
+                    remaining = self._deadline - time.monotonic()
+            self.flush()
+
+    def _write(self, config):
+        try:
+            self.save_func(config)
+            self.writes += 1
+        except OSError as e:
+            logger.error("保存配置失败: %s", e)
\ No newline at end of file
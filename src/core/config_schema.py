@@ -0,0 +1,328 @@
+SCHEMA_VERSION = 2
+DEFAULT_SCENE_ID = 'scene_1'
+MAX_REPORTED_ISSUES = 20    # 提示中最多列出的问题数
+# keyboard 库的修饰键名称到统一名称的映射，左右两侧的修饰键视为同一个
+MODIFIER_NAMES = {
+    'CTRL': 'CTRL', 'LEFT CTRL': 'CTRL', 'RIGHT CTRL': 'CTRL',
+    'ALT': 'ALT', 'LEFT ALT': 'ALT', 'RIGHT ALT': 'ALT', 'ALT GR': 'ALT',
+    'SHIFT': 'SHIFT', 'LEFT SHIFT': 'SHIFT', 'RIGHT SHIFT': 'SHIFT',
+    'WINDOWS': 'WINDOWS', 'LEFT WINDOWS': 'WINDOWS', 'RIGHT WINDOWS': 'WINDOWS',
+}
+
+
+class ConfigError(ValueError):
+    """配置无法迁移或使用"""
+
+
+# 各版本配置的迁移函数，按版本顺序执行，第 i 个函数把版本 i 的配置升级到版本 i + 1
+def _migrate_0(config):
+    """版本 0：只有一组 key_sounds 的旧版配置，放入默认场景"""
+    migrated = {key: value for key, value in config.items() if key != 'key_sounds'}
+    migrated['current_scene'] = 'default'
+    migrated['scenes'] = {
+        'default': {
+            'name': '默认场景',
+            'key_sounds': config['key_sounds']
+        }
+    }
+    return migrated
+
+
+def _migrate_1(config):
+    """版本 1：按键名称统一为大写，与按键事件解析出的名称一致"""
+    scenes = config.get('scenes')
+    if isinstance(scenes, dict):
+        for scene in scenes.values():
+            if not isinstance(scene, dict):
+                continue
+            for field in ('key_sounds', 'key_options'):
+                mapping = scene.get(field)
+                if isinstance(mapping, dict) and any(type(key) is str and key != key.upper() for key in mapping):
+                    scene[field] = {key.upper() if type(key) is str else key: value
+                                    for key, value in mapping.items()}
+    if isinstance(config.get('stop_key'), str):
+        config['stop_key'] = config['stop_key'].upper()
+    return config
+
+
+MIGRATIONS = (_migrate_0, _migrate_1)
+
+
+def detect_version(config):
+    """判断配置的版本"""
+    if not isinstance(config, dict):
+        raise ConfigError("无效的配置文件格式")
+    version = config.get('schema_version')
+    if version is not None:
+        if type(version) is not int or version < 0:
+            raise ConfigError(f"无效的配置版本: {version!r}")
+        if version > SCHEMA_VERSION:
+            raise ConfigError(f"配置文件版本 {version} 高于当前程序支持的版本 {SCHEMA_VERSION}，请升级程序")
+        return version
+    if 'scenes' in config:
+        return 1
+    if 'key_sounds' in config:
+        return 0
+    raise ConfigError("无效的配置文件格式")
+
+
+def migrate(config):
+    """把配置依次迁移到当前版本，已是当前版本时不做任何处理"""
+    version = detect_version(config)
+    for step in MIGRATIONS[version:]:
+        config = step(config)
+    config['schema_version'] = SCHEMA_VERSION
+    return config
+
+
+# 字段检查器：返回规范化后的值，值无效时抛出 ValueError
+def _bool():
+    def check(value):
+        if type(value) is not bool:
+            raise ValueError("应为 true 或 false")
+        return value
+    return check
+
+
+def _number(minimum, maximum, integer=False):
+    def check(value):
+        if type(value) is bool or not isinstance(value, int if integer else (int, float)):
+            raise ValueError("应为整数" if integer else "应为数字")
+        if not minimum <= value <= maximum:
+            raise ValueError(f"应在 {minimum} 到 {maximum} 之间")
+        return value if integer else float(value)
+    return check
+
+
+def _string(allow_empty=True, upper=False):
+    def check(value):
+        if type(value) is not str or (not allow_empty and not value.strip()):
+            raise ValueError("应为非空字符串" if not allow_empty else "应为字符串")
+        return value.upper() if upper else value
+    return check
+
+
+def _choice(*values):
+    def check(value):
+        if value not in values:
+            raise ValueError(f"应为 {' / '.join(values)} 之一")
+        return value
+    return check
+
+
+def _optional(inner):
+    def check(value):
+        return None if value is None else inner(value)
+    return check
+
+
+def _modifiers():
+    """"CTRL+ALT" 形式的修饰键组合，空字符串表示不启用"""
+    def check(value):
+        if type(value) is not str:
+            raise ValueError("应为字符串")
+        unknown = [name for name in (part.strip().upper() for part in value.split('+'))
+                   if name and name not in MODIFIER_NAMES]
+        if unknown:
+            raise ValueError(f"包含未知的修饰键 {' / '.join(unknown)}，可用 CTRL / ALT / SHIFT / WINDOWS")
+        return value
+    return check
+
+
+def _sequence(max_steps=32):
+    """按键序列：[{"sound": 路径, "delay_ms": 距上一步的毫秒数, "loop_ms": 重复间隔}]，只有最后一步可以循环"""
+    delay = _number(0, 60000)
+    loop = _number(10, 60000)
+
+    def check(value):
+        if not isinstance(value, list) or not 0 < len(value) <= max_steps:
+            raise ValueError(f"应为包含 1 到 {max_steps} 步的列表")
+        steps = []
+        for index, step in enumerate(value):
+            if not isinstance(step, dict) or type(step.get('sound')) is not str or not step['sound']:
+                raise ValueError(f"第 {index + 1} 步应包含音频路径 sound")
+            normalized = {'sound': step['sound'], 'delay_ms': delay(step.get('delay_ms', 0))}
+            if step.get('loop_ms') is not None:
+                if index != len(value) - 1:
+                    raise ValueError("只有最后一步可以设置 loop_ms")
+                normalized['loop_ms'] = loop(step['loop_ms'])
+            steps.append(normalized)
+        return steps
+    return check
+
+
+# 顶层字段：名称、默认值、检查器规格
+FIELDS = (
+    ('stop_key', 'SPACE', _string(allow_empty=False, upper=True)),
+    ('stop_on_unbound', True, _bool()),
+    ('long_press_optimize', True, _bool()),
+    ('event_queue_size', 256, _number(1, 65536, integer=True)),
+    ('sample_cache_budget_mb', 256, _number(0, 1 << 20, integer=True)),
+    ('voice_count', 16, _number(1, 256, integer=True)),
+    ('max_voices_per_key', 2, _number(1, 256, integer=True)),
+    ('voice_steal_policy', 'oldest', _choice('oldest', 'quietest', 'same_key')),
+    ('latency_tracking', False, _bool()),
+    ('scene_hotkey_modifiers', 'CTRL+ALT', _modifiers()),
+    ('normalize_loudness', False, _bool()),
+    ('target_loudness', -18.0, _number(-70, 0)),
+    ('pcm_cache_size_mb', 1024, _number(0, 1 << 20, integer=True)),
+    ('stream_threshold_mb', 8, _number(0, 1 << 20)),
+    ('retrigger_interval_ms', 0, _number(0, 10000)),
+)
+
+# 按键选项（场景的 key_options 中每个按键的设置）
+OPTION_FIELDS = {
+    'stream': _optional(_bool()),
+    'sequence': _sequence(),
+    'gain_db': _number(-60, 24),
+    'fade_in_ms': _number(0, 10000),
+    'fade_out_ms': _number(0, 10000),
+    'pitch_variation': _number(0, 12),
+    'variants': _number(1, 16, integer=True),
+}
+
+
+def default_config():
+    """默认配置"""
+    config = {
+        'schema_version': SCHEMA_VERSION,
+        'current_scene': DEFAULT_SCENE_ID,
+        'scenes': {
+            DEFAULT_SCENE_ID: {
+                'name': '默认场景',
+                'key_sounds': {}
+            }
+        },
+    }
+    for name, default, _ in FIELDS:
+        config[name] = default
+    return config
+
+
+class ConfigValidator:
+    """配置校验器
+
+    字段规格在模块加载时编译为检查函数，加载配置时只执行一遍。
+    无效的字段恢复为默认值，无效的场景和按键绑定被移除，所有问题收集到一个列表中一次性返回，
+    不会因为单个错误中断加载。按键绑定先整体判断是否全部有效，只有存在无效项时才逐项检查，
+    上千个场景的配置也只需要一次遍历。
+    """
+
+    def __init__(self, fields=FIELDS, option_fields=OPTION_FIELDS):
+        self.fields = fields
+        self.option_fields = option_fields
+
+    def validate(self, config):
+        """校验并就地修正配置，返回 (配置, 问题列表)"""
+        issues = []
+        for name, default, check in self.fields:
+            if name not in config:
+                config[name] = default
+                continue
+            try:
+                config[name] = check(config[name])
+            except ValueError as e:
+                issues.append(f"{name}: {config[name]!r} {e}，已恢复为默认值 {default!r}")
+                config[name] = default
+
+        scenes = config.get('scenes')
+        if not isinstance(scenes, dict):
+            issues.append("scenes: 应为对象，已重置为默认场景")
+            scenes = {}
+        for scene_id in list(scenes):
+            if not self._validate_scene(scene_id, scenes[scene_id], issues):
+                del scenes[scene_id]
+        if not scenes:
+            scenes[DEFAULT_SCENE_ID] = {'name': '默认场景', 'key_sounds': {}}
+        config['scenes'] = scenes
+
+        current = config.get('current_scene')
+        if type(current) is not str:
+            if current is not None:
+                issues.append(f"current_scene: {current!r} 应为字符串，已切换到第一个场景")
+            config['current_scene'] = next(iter(scenes))
+        elif current not in scenes:
+            issues.append(f"current_scene: 场景 {current!r} 不存在，已切换到第一个场景")
+            config['current_scene'] = next(iter(scenes))
+        return config, issues
+
+    def validate_scene(self, scene_id, scene):
+        """校验单个导入的场景，返回问题列表，场景整体无效时抛出 ConfigError"""
+        issues = []
+        if not self._validate_scene(scene_id, scene, issues):
+            raise ConfigError("无效的场景格式")
+        return issues
+
+    def _validate_scene(self, scene_id, scene, issues):
+        """校验单个场景，场景整体无效时返回 False"""
+        if type(scene_id) is not str or not isinstance(scene, dict):
+            issues.append(f"场景 {scene_id!r}: 格式无效，已移除")
+            return False
+        if type(scene.get('name')) is not str:
+            issues.append(f"场景 {scene_id}: 名称无效，已使用场景ID代替")
+            scene['name'] = scene_id
+
+        key_sounds = scene.get('key_sounds')
+        if not isinstance(key_sounds, dict):
+            if key_sounds is not None:
+                issues.append(f"场景 {scene['name']}: key_sounds 应为对象，已清空")
+            key_sounds = scene['key_sounds'] = {}
+        elif not all(type(key) is str and key and type(path) is str and path
+                     for key, path in key_sounds.items()):
+            for key, path in list(key_sounds.items()):
+                if not (type(key) is str and key):
+                    issues.append(f"场景 {scene['name']}: 按键名称 {key!r} 无效，已移除该绑定")
+                    del key_sounds[key]
+                elif not (type(path) is str and path):
+                    issues.append(f"场景 {scene['name']}: 按键 {key} 的音频路径 {path!r} 无效，已移除该绑定")
+                    del key_sounds[key]
+
+        options = scene.get('key_options')
+        if options is not None:
+            if not isinstance(options, dict):
+                issues.append(f"场景 {scene['name']}: key_options 应为对象，已清空")
+                del scene['key_options']
+            else:
+                self._validate_options(scene, key_sounds, options, issues)
+        return True
+
+    def _validate_options(self, scene, key_sounds, options, issues):
+        """校验按键选项，已解除绑定的按键的选项直接丢弃"""
+        for key in list(options):
+            values = options[key]
+            if key not in key_sounds:
+                del options[key]
+                continue
+            if not isinstance(values, dict):
+                issues.append(f"场景 {scene['name']}: 按键 {key} 的选项格式无效，已移除")
+                del options[key]
+                continue
+            for name in list(values):
+                check = self.option_fields.get(name)
+                if check is None:
+                    continue
+                try:
+                    values[name] = check(values[name])
+                except ValueError as e:
+                    issues.append(f"场景 {scene['name']}: 按键 {key} 的选项 {name}={values[name]!r} {e}，已移除")
+                    del values[name]
+            if not values:
+                del options[key]
+        if not options:
+            del scene['key_options']
+
+
+validator = ConfigValidator()
+
+
+def load(config):
+    """迁移并校验配置，返回 (配置, 问题列表)"""
+    return validator.validate(migrate(config))
+
+
+def format_issues(issues, limit=MAX_REPORTED_ISSUES):
+    """把问题列表合并为一条提示信息"""
+    lines = issues[:limit]
+    if len(issues) > limit:
+        lines.append(f"……另有 {len(issues) - limit} 项")
+    return "\n".join(lines)
@@ -0,0 +1,158 @@
+import threading
+from ..utils.logger import logger
+
+
+class KeyEventQueue:
+    """按键事件环形队列
+
+    单生产者（键盘钩子线程）/ 单消费者（分发线程）的有界环形缓冲区。
+    head 只由消费者修改，tail 只由生产者修改，依赖 GIL 保证整数赋值的原子性，
+    因此写入和读取都不需要加锁。队列满时直接丢弃新事件并计数，绝不阻塞钩子线程。
+    队列末尾保留一部分位置只给优先事件（按键松开）使用：普通事件在保留区之前就被丢弃，
+    丢失松开事件会让按键一直处于按下状态，之后的按下都被当作长按忽略。
+    """
+
+    def __init__(self, capacity=256):
+        self.capacity = max(2, int(capacity))
+        self.reserved = max(1, self.capacity // 8)  # 只给优先事件使用的位置数
+        self._buffer = [None] * self.capacity
+        self._head = 0              # 下一个读取位置（只增不减）
+        self._tail = 0              # 下一个写入位置（只增不减）
+        self._wakeup = threading.Event()
+        self._overflowing = False   # 当前是否处于溢出状态
+        self.enqueued = 0           # 成功入队的事件数
+        self.dropped = 0            # 因队列已满被丢弃的事件数
+        self.dropped_priority = 0   # 保留区也已满时被丢弃的优先事件数
+        self.overflows = 0          # 发生溢出的次数（连续丢弃只记一次）
+        self.max_depth = 0          # 观察到的最大队列深度
+
+    def put(self, item, priority=False):
+        """写入一个事件，队列已满时返回 False，priority 为 True 时可以使用保留区"""
+        tail = self._tail
+        depth = tail - self._head
+        if depth >= (self.capacity if priority else self.capacity - self.reserved):
+            self.dropped += 1
+            if priority:
+                self.dropped_priority += 1
+            if not self._overflowing:
+                self._overflowing = True
+                self.overflows += 1
+            return False
+
+        self._overflowing = False
+        self._buffer[tail % self.capacity] = item
+        self._tail = tail + 1
+        self.enqueued += 1
+        if depth >= self.max_depth:
+            self.max_depth = depth + 1
+        self._wakeup.set()
+        return True
+
+    def drain(self, max_items=32):
+        """批量取出最多 max_items 个事件"""
+        head = self._head
+        count = min(self._tail - head, max_items)
+        if count <= 0:
+            return []
+
+        batch = []
+        for index in range(head, head + count):
+            slot = index % self.capacity
+            batch.append(self._buffer[slot])
+            self._buffer[slot] = None
+        self._head = head + count
+        return batch
+
+    def wait(self, timeout=None):
+        """等待新事件到达"""
+        self._wakeup.wait(timeout)
+        self._wakeup.clear()
+
+    def wake(self):
+        """唤醒等待中的消费者"""
+        self._wakeup.set()
+
+    def clear(self):
+        """丢弃所有未处理的事件（只能在消费者线程或消费者停止后调用）"""
+        while self.drain(self.capacity):
+            pass
+
+    def __len__(self):
+        return self._tail - self._head
+
+    def get_stats(self):
+        """获取队列统计信息"""
+        return {
+            'capacity': self.capacity,
+            'depth': len(self),
+            'max_depth': self.max_depth,
+            'enqueued': self.enqueued,
+            'dropped': self.dropped,
+            'dropped_priority': self.dropped_priority,
+            'overflows': self.overflows,
+        }
+
+
+class KeyEventDispatcher:
+    """按键事件分发线程，从队列中批量取出事件并交给处理函数
+
+    保留区也被占满时仍可能丢失优先事件，此时在分发线程中调用 on_lost_priority，
+    由调用方清除依赖这些事件的状态。
+    """
+
+    def __init__(self, event_queue, handler, batch_size=32, idle_timeout=0.5, on_lost_priority=None):
+        self.queue = event_queue
+        self.handler = handler
+        self.on_lost_priority = on_lost_priority
+        self.batch_size = batch_size
+        self.idle_timeout = idle_timeout
+        self.batches = 0            # 已处理的批次数
+        self.dispatched = 0         # 已处理的事件数
+        self._running = False
+        self._thread = None
+        self._lost_seen = 0         # 已处理过的丢失优先事件数
+
+    @property
+    def is_running(self):
+        return self._running
+
+    def start(self):
+        """启动分发线程"""
+        if self._running:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name='KeyEventDispatcher', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=1.0):
+        """停止分发线程，并丢弃未处理的事件"""
+        if not self._running:
+            return
+        self._running = False
+        self.queue.wake()
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join(timeout)
+        self._thread = None
+        self.queue.clear()
+
+    def _run(self):
+        while self._running:
+            self.queue.wait(self.idle_timeout)
+            while self._running:
+                batch = self.queue.drain(self.batch_size)
+                if not batch:
+                    break
+                lost = self.queue.dropped_priority
+                if lost != self._lost_seen:
+                    self._lost_seen = lost
+                    if self.on_lost_priority is not None:
+                        self.on_lost_priority()
+                self.batches += 1
+                for item in batch:
+                    if not self._running:
+                        break
+                    try:
+                        self.handler(*item)
+                    except Exception:
+                        logger.exception("处理按键事件失败")
+                    self.dispatched += 1
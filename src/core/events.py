@@ -0,0 +1,47 @@
+import threading
+from collections import namedtuple
+
+# 播放器发布的事件类型
+SoundPlayed = namedtuple('SoundPlayed', ['key'])                    # 播放了按键音效
+SoundStopped = namedtuple('SoundStopped', [])                       # 按下停止键停止播放
+KeyUnbound = namedtuple('KeyUnbound', ['key'])                      # 按下了未绑定音效的按键
+LoadProgress = namedtuple('LoadProgress', ['ready', 'total', 'done'])  # 后台加载进度
+LoadError = namedtuple('LoadError', ['errors'])                     # 加载失败的文件列表 [(路径, 错误信息)]
+SceneSwitched = namedtuple('SceneSwitched', ['scene_id'])           # 当前场景发生变化
+RunningChanged = namedtuple('RunningChanged', ['is_running'])       # 监听状态变化
+Message = namedtuple('Message', ['kind', 'title', 'text'])          # 需要提示用户的信息（error / warning / info）
+BindingsDecoded = namedtuple('BindingsDecoded', ['scene_id', 'key_sounds', 'sounds', 'issues'])  # 批量导入的音频已解码，等待提交
+BindingsImported = namedtuple('BindingsImported', ['scene_id', 'keys', 'issues'])  # 批量导入的绑定已提交
+
+
+class EventBus:
+    """简单的发布/订阅事件总线
+
+    发布者可以在任意线程中调用 publish，订阅者的回调在发布线程中同步执行，
+    因此回调必须足够轻量；需要操作界面的订阅者应自行切换到界面线程。
+    订阅列表采用写时复制，发布时无需加锁。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = {}      # 事件类型 -> 回调元组，None 表示订阅所有事件
+
+    def subscribe(self, event_type, callback):
+        """订阅某类事件，event_type 为 None 时订阅所有事件"""
+        with self._lock:
+            callbacks = self._subscribers.get(event_type, ())
+            self._subscribers[event_type] = callbacks + (callback,)
+
+    def unsubscribe(self, event_type, callback):
+        """取消订阅"""
+        with self._lock:
+            callbacks = self._subscribers.get(event_type, ())
+            self._subscribers[event_type] = tuple(cb for cb in callbacks if cb != callback)
+
+    def publish(self, event):
+        """发布事件"""
+        subscribers = self._subscribers
+        for callback in subscribers.get(type(event), ()):
+            callback(event)
+        for callback in subscribers.get(None, ()):
+            callback(event)
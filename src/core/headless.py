@@ -0,0 +1,65 @@
+import signal
+import sys
+import threading
+from .events import EventBus, LoadProgress, LoadError, Message, SceneSwitched
+from .sound_player import SoundPlayer
+from ..utils.startup_profiler import StartupProfiler
+
+
+def print_event(event):
+    """无界面模式下把播放器事件输出到终端"""
+    if isinstance(event, Message):
+        print(f"[{event.title}] {event.text}", file=sys.stderr)
+    elif isinstance(event, LoadProgress):
+        if event.done:
+            print(f"音频已就绪 {event.ready}/{event.total}")
+    elif isinstance(event, LoadError):
+        for path, error in event.errors:
+            print(f"[警告] {path}: {error}", file=sys.stderr)
+    elif isinstance(event, SceneSwitched):
+        print(f"已切换到场景: {event.scene_id}")
+
+
+def run_headless(profiler=None):
+    """无界面模式：直接按 config.json 监听按键并播放音效
+
+    不导入 tkinter、PIL 和 pystray，也不创建窗口和托盘图标。
+    按 Ctrl+C 或发送 SIGTERM 退出。
+    """
+    stop_event = threading.Event()
+
+    def on_signal(signum, frame):
+        stop_event.set()
+
+    signal.signal(signal.SIGINT, on_signal)
+    if hasattr(signal, 'SIGTERM'):
+        signal.signal(signal.SIGTERM, on_signal)
+
+    events = EventBus()
+    for event_type in (Message, LoadProgress, LoadError, SceneSwitched):
+        events.subscribe(event_type, print_event)
+    profiler = profiler or StartupProfiler()
+    with profiler.phase("创建播放器"):
+        player = SoundPlayer(events)
+    scene = player.scenes[player.current_scene]
+    print(f"当前场景: {scene['name']}，绑定按键 {len(player.key_sounds)} 个，停止键: {player.stop_key}")
+
+    try:
+        with profiler.phase("启动键盘监听"):
+            player.toggle_running()
+    except Exception as e:
+        # keyboard 在 Linux 下需要 root 权限和可用的输入设备
+        print(f"[错误] 启动键盘监听失败: {str(e) or type(e).__name__}", file=sys.stderr)
+        return 1
+    finally:
+        profiler.report()
+    print("正在运行，按 Ctrl+C 退出")
+
+    try:
+        # 使用带超时的等待，保证 Windows 下 Ctrl+C 能及时响应
+        while not stop_event.wait(0.5):
+            pass
+    finally:
+        player.shutdown()
+        print("已停止")
+    return 0
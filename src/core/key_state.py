@@ -0,0 +1,49 @@
+class KeyStateFilter:
+    """钩子线程中的按键状态过滤
+
+    记录每个按键（按扫描码区分，没有扫描码时按名称）是否按下以及上次触发的时间，
+    在事件入队之前丢弃系统自动重复产生的按下事件，以及距上次触发不足最小间隔的按下事件，
+    避免按住按键时大量重复事件涌入分发线程。只在钩子线程中调用，不需要加锁。
+    """
+
+    def __init__(self, retrigger_interval=0.0):
+        self.retrigger_interval = retrigger_interval  # 同一按键两次触发的最小间隔（秒）
+        self._down = set()          # 当前按下的按键
+        self._last_press = {}       # 按键 -> 上次触发的时间
+        self.accepted = 0           # 放行的按下事件数
+        self.suppressed_repeats = 0     # 丢弃的自动重复事件数
+        self.suppressed_retriggers = 0  # 因间隔过短丢弃的事件数
+
+    def accept_press(self, event, now, filter_repeats=True):
+        """判断按下事件是否需要处理"""
+        key = event.scan_code or event.name
+        if key in self._down:
+            if filter_repeats:
+                self.suppressed_repeats += 1
+                return False
+        else:
+            self._down.add(key)
+        last = self._last_press.get(key)
+        if last is not None and now - last < self.retrigger_interval:
+            self.suppressed_retriggers += 1
+            return False
+        self._last_press[key] = now
+        self.accepted += 1
+        return True
+
+    def release(self, event):
+        """记录按键松开"""
+        self._down.discard(event.scan_code or event.name)
+
+    def reset(self):
+        """清空按键状态，开始或停止监听时调用"""
+        self._down.clear()
+        self._last_press.clear()
+
+    def get_stats(self):
+        """获取过滤统计信息"""
+        return {
+            'accepted': self.accepted,
+            'suppressed_repeats': self.suppressed_repeats,
+            'suppressed_retriggers': self.suppressed_retriggers,
+        }
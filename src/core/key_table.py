@@ -0,0 +1,82 @@
+import sys
+import keyboard
+from ..utils.logger import logger
+
+TABLE_SIZE = 1024   # 扫描码表的大小，超出范围的扫描码按名称处理
+AMBIGUOUS = object()  # 多个已绑定名称共用同一扫描码的标记
+
+
+class KeyTable:
+    """扫描码到按键名称的转换层
+
+    配置文件仍然使用按键名称。构建时通过 keyboard.key_to_scan_codes 把所有用到的名称
+    解析为扫描码，存入以扫描码为下标的列表，列表中存放的是驻留的大写名称字符串。
+    按键事件到达时直接用扫描码取出名称，不必调用 event.name.upper() 生成新字符串；
+    同一个物理按键在不同键盘布局、按住 Shift 时上报的名称不同，也会得到同一个名称。
+
+    修饰键、无法解析的名称、小键盘按键和被多个名称共用的扫描码仍按事件名称处理。
+    """
+
+    def __init__(self):
+        self.codes = [None] * TABLE_SIZE
+        self.resolved = 0       # 通过扫描码得到名称的事件数
+        self.fallbacks = 0      # 按事件名称处理的事件数
+
+    def build(self, names):
+        """根据一组按键名称重建扫描码表，返回成功解析的名称数量"""
+        codes = [None] * TABLE_SIZE
+        mapped = 0
+        for name in names:
+            # 修饰键分左右两侧，名称与扫描码不是一一对应，仍按名称处理
+            if name.lower() in keyboard.all_modifiers:
+                continue
+            name = sys.intern(name.upper())
+            try:
+                scan_codes = keyboard.key_to_scan_codes(name.lower(), False)
+            except Exception as e:
+                # 部分平台（例如缺少 dumpkeys 的 Linux）无法查询扫描码，全部按名称处理
+                logger.debug("无法解析按键 %s 的扫描码: %s", name, e)
+                break
+            if scan_codes:
+                mapped += 1
+            for code in scan_codes:
+                if not 0 <= code < TABLE_SIZE:
+                    continue
+                if codes[code] is None:
+                    codes[code] = name
+                elif codes[code] is not name:
+                    codes[code] = AMBIGUOUS
+        # 替换整个列表，分发线程读到的总是完整的表
+        self.codes = codes
+        return mapped
+
+    def load(self, scan_codes):
+        """直接使用已知的 {按键名称: 扫描码} 映射构建扫描码表，用于回放和基准测试等不查询系统键盘布局的场合"""
+        codes = [None] * TABLE_SIZE
+        for name, code in scan_codes.items():
+            if 0 <= code < TABLE_SIZE:
+                codes[code] = sys.intern(name.upper())
+        self.codes = codes
+
+    def clear(self):
+        """清空扫描码表，所有事件按名称处理"""
+        self.codes = [None] * TABLE_SIZE
+
+    def resolve(self, event):
+        """获取事件对应的大写按键名称"""
+        code = event.scan_code
+        if code is not None and 0 <= code < TABLE_SIZE and not getattr(event, 'is_keypad', False):
+            name = self.codes[code]
+            if name is not None and name is not AMBIGUOUS:
+                self.resolved += 1
+                return name
+        self.fallbacks += 1
+        return event.name.upper()
+
+    def get_stats(self):
+        """获取转换统计信息"""
+        return {
+            'mapped_codes': sum(1 for name in self.codes if name is not None and name is not AMBIGUOUS),
+            'resolved': self.resolved,
+            'fallbacks': self.fallbacks,
+        }
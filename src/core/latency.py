@@ -0,0 +1,106 @@
+import csv
+import json
+import math
+import threading
+from collections import deque
+
+# 统计的延迟阶段：钩子 -> 分发、分发 -> 调用 play()、钩子 -> 调用 play()
+STAGES = ('queue', 'dispatch', 'total')
+STAGE_NAMES = {
+    'queue': '钩子 → 分发',
+    'dispatch': '分发 → 播放',
+    'total': '钩子 → 播放',
+}
+
+
+def percentile(sorted_values, fraction):
+    """计算已排序数据的百分位数（最近秩法）"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(fraction * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+class LatencyTracker:
+    """按键到声音输出的延迟统计
+
+    每个播放事件记录三个时间点：钩子线程收到按键、分发线程开始处理、调用 play()。
+    只保留最近 window 个事件的滚动窗口，查询时才计算 p50/p95/p99。
+    未启用时播放路径上只有一次布尔判断。
+    """
+
+    def __init__(self, window=2048):
+        self.enabled = False
+        self.window = window
+        self._lock = threading.Lock()
+        self._records = deque(maxlen=window)   # (按键, 钩子时间, 分发时间, 播放时间)
+        self.recorded = 0
+
+    def record(self, key, hook_time, dispatch_time, play_time):
+        """记录一次播放的各阶段时间戳（秒，time.perf_counter）"""
+        with self._lock:
+            self._records.append((key, hook_time, dispatch_time, play_time))
+            self.recorded += 1
+
+    def reset(self):
+        """清空统计数据"""
+        with self._lock:
+            self._records.clear()
+            self.recorded = 0
+
+    def get_records(self):
+        """获取滚动窗口内的所有记录"""
+        with self._lock:
+            return list(self._records)
+
+    def get_summary(self):
+        """计算各阶段的延迟统计（毫秒）"""
+        records = self.get_records()
+        durations = {
+            'queue': sorted((dispatch - hook) * 1000 for _, hook, dispatch, _ in records),
+            'dispatch': sorted((play - dispatch) * 1000 for _, _, dispatch, play in records),
+            'total': sorted((play - hook) * 1000 for _, hook, _, play in records),
+        }
+        summary = {}
+        for stage in STAGES:
+            values = durations[stage]
+            summary[stage] = {
+                'count': len(values),
+                'p50': percentile(values, 0.50),
+                'p95': percentile(values, 0.95),
+                'p99': percentile(values, 0.99),
+                'max': values[-1] if values else 0.0,
+            }
+        return summary
+
+    def export_json(self, filepath):
+        """导出统计摘要和原始记录为 JSON"""
+        records = self.get_records()
+        data = {
+            'summary_ms': self.get_summary(),
+            'events': [
+                {
+                    'key': key,
+                    'hook': hook,
+                    'dispatch': dispatch,
+                    'play': play,
+                }
+                for key, hook, dispatch, play in records
+            ],
+        }
+        with open(filepath, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=4, ensure_ascii=False)
+
+    def export_csv(self, filepath):
+        """导出原始记录为 CSV，每行一个播放事件"""
+        records = self.get_records()
+        with open(filepath, 'w', encoding='utf-8', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['key', 'hook', 'dispatch', 'play', 'queue_ms', 'dispatch_ms', 'total_ms'])
+            for key, hook, dispatch, play in records:
+                writer.writerow([
+                    key, f"{hook:.6f}", f"{dispatch:.6f}", f"{play:.6f}",
+                    f"{(dispatch - hook) * 1000:.3f}",
+                    f"{(play - dispatch) * 1000:.3f}",
+                    f"{(play - hook) * 1000:.3f}",
+                ])
@@ -0,0 +1,151 @@
+import math
+
+# numpy 只在真正分析或处理音频时才导入，未开启响度统一时启动不需要加载 numpy
+BLOCK_SECONDS = 0.4         # 响度测量的分块长度（秒）
+HOP_SECONDS = 0.1           # 分块步长（秒），相邻分块重叠 75%
+ABSOLUTE_GATE = -70.0       # 绝对门限（LUFS）
+RELATIVE_GATE = -10.0       # 相对门限（LU）
+DEFAULT_TARGET_LOUDNESS = -18.0  # 默认目标响度（LUFS）
+PEAK_CEILING = -1.0         # 增益后允许的最高峰值（dBFS）
+MAX_GAIN_DB = 12.0          # 最大提升
+MIN_GAIN_DB = -24.0         # 最大衰减
+FFT_BATCH = 64              # 每次一起做 FFT 的分块数，限制内存占用
+
+# 混音器采样格式（pygame.mixer.get_init 的第二项）到 numpy 类型名称的映射
+SAMPLE_DTYPES = {
+    -16: 'int16',
+    16: 'uint16',
+    -8: 'int8',
+    8: 'uint8',
+    32: 'float32',
+}
+
+
+def _biquad_power(b, a, w):
+    """计算双二阶滤波器在角频率 w 处的功率响应 |H|^2"""
+    import numpy as np
+    z = np.exp(-1j * w)
+    h = (b[0] + b[1] * z + b[2] * z * z) / (a[0] + a[1] * z + a[2] * z * z)
+    return np.abs(h) ** 2
+
+
+def k_weighting(rate, n_fft):
+    """ITU-R BS.1770 的 K 计权（高架滤波 + 高通滤波）在各 FFT 频点上的功率响应"""
+    import numpy as np
+    w = 2 * np.pi * np.fft.rfftfreq(n_fft)
+
+    # 高架滤波：+4 dB，1500 Hz
+    gain = 10 ** (4.0 / 40)
+    w0 = 2 * np.pi * 1500.0 / rate
+    alpha = np.sin(w0) / (2 * (1 / np.sqrt(2)))
+    cos_w0 = np.cos(w0)
+    shelf_b = (gain * ((gain + 1) + (gain - 1) * cos_w0 + 2 * np.sqrt(gain) * alpha),
+               -2 * gain * ((gain - 1) + (gain + 1) * cos_w0),
+               gain * ((gain + 1) + (gain - 1) * cos_w0 - 2 * np.sqrt(gain) * alpha))
+    shelf_a = ((gain + 1) - (gain - 1) * cos_w0 + 2 * np.sqrt(gain) * alpha,
+               2 * ((gain - 1) - (gain + 1) * cos_w0),
+               (gain + 1) - (gain - 1) * cos_w0 - 2 * np.sqrt(gain) * alpha)
+
+    # 高通滤波：38 Hz
+    w0 = 2 * np.pi * 38.0 / rate
+    alpha = np.sin(w0) / (2 * 0.5)
+    cos_w0 = np.cos(w0)
+    highpass_b = ((1 + cos_w0) / 2, -(1 + cos_w0), (1 + cos_w0) / 2)
+    highpass_a = (1 + alpha, -2 * cos_w0, 1 - alpha)
+
+    return _biquad_power(shelf_b, shelf_a, w) * _biquad_power(highpass_b, highpass_a, w)
+
+
+def to_float(raw, size, channels):
+    """把混音器格式的原始 PCM 转为 (帧数, 声道数) 的浮点数组，范围 [-1, 1]"""
+    import numpy as np
+    dtype = np.dtype(SAMPLE_DTYPES[size])
+    samples = np.frombuffer(raw, dtype=dtype)
+    samples = samples[:len(samples) - len(samples) % channels].reshape(-1, channels)
+    if dtype == np.float32:
+        return samples.astype(np.float64)
+    info = np.iinfo(dtype)
+    # 无符号格式以中间值为零点
+    offset = (int(info.max) + 1) // 2 if info.min == 0 else 0
+    scale = float(info.max - offset + 1)
+    return (samples.astype(np.float64) - offset) / scale
+
+
+def from_float(samples, size):
+    """把浮点数组转回混音器格式的原始 PCM"""
+    import numpy as np
+    dtype = np.dtype(SAMPLE_DTYPES[size])
+    samples = np.clip(samples, -1.0, 1.0)
+    if dtype == np.float32:
+        return samples.astype(np.float32).tobytes()
+    info = np.iinfo(dtype)
+    offset = (int(info.max) + 1) // 2 if info.min == 0 else 0
+    scale = float(info.max - offset + 1)
+    values = np.clip(np.round(samples * scale) + offset, info.min, info.max)
+    return values.astype(dtype).tobytes()
+
+
+def measure(samples, rate):
+    """测量积分响度（LUFS）和采样峰值（dBFS）
+
+    按 BS.1770 分成 400 毫秒、重叠 75% 的块，在频域做 K 计权后计算每块的均方能量，
+    再经过绝对门限和相对门限求平均。短于一个分块的音效整段作为一个块计算。
+    峰值为采样峰值，没有做过采样的真峰值估计。
+    """
+    import numpy as np
+    if not len(samples):
+        return ABSOLUTE_GATE, float('-inf')
+    peak = float(np.max(np.abs(samples)))
+    peak_db = float(20 * np.log10(peak)) if peak > 0 else float('-inf')
+
+    block = min(len(samples), int(rate * BLOCK_SECONDS))
+    hop = max(1, int(rate * HOP_SECONDS))
+    starts = range(0, len(samples) - block + 1, hop)
+    weights = k_weighting(rate, block)
+    # 单边频谱中除直流和奈奎斯特频点外的能量需要计两次
+    weights[1:(block + 1) // 2] *= 2
+
+    energies = []
+    starts = list(starts)
+    for i in range(0, len(starts), FFT_BATCH):
+        batch = np.stack([samples[start:start + block] for start in starts[i:i + FFT_BATCH]])
+        spectrum = np.fft.rfft(batch, axis=1)
+        # Parseval 定理：频域能量除以 N^2 即为时域均方值
+        power = (np.abs(spectrum) ** 2 * weights[None, :, None]).sum(axis=1) / (block * block)
+        energies.append(power.sum(axis=1))
+    energies = np.concatenate(energies)
+
+    with np.errstate(divide='ignore'):
+        block_loudness = -0.691 + 10 * np.log10(energies)
+    gated = energies[block_loudness > ABSOLUTE_GATE]
+    if not len(gated):
+        return ABSOLUTE_GATE, peak_db
+    relative_gate = -0.691 + 10 * np.log10(gated.mean()) + RELATIVE_GATE
+    gated = energies[block_loudness > max(relative_gate, ABSOLUTE_GATE)]
+    return float(-0.691 + 10 * np.log10(gated.mean())), peak_db
+
+
+def compute_gain(loudness, peak_db, target=DEFAULT_TARGET_LOUDNESS):
+    """根据响度和峰值计算增益（dB），保证增益后峰值不超过上限"""
+    if loudness <= ABSOLUTE_GATE:
+        return 0.0
+    gain = target - loudness
+    if math.isfinite(peak_db):
+        gain = min(gain, PEAK_CEILING - peak_db)
+    return float(min(MAX_GAIN_DB, max(MIN_GAIN_DB, gain)))
+
+
+def normalize(raw, mixer_format, target=DEFAULT_TARGET_LOUDNESS):
+    """分析混音器格式的原始 PCM 并应用响度增益
+
+    返回 (处理后的 PCM, 增益 dB, 响度 LUFS, 峰值 dBFS)；不支持的采样格式原样返回。
+    """
+    rate, size, channels = mixer_format
+    if size not in SAMPLE_DTYPES:
+        return raw, 0.0, ABSOLUTE_GATE, 0.0
+    samples = to_float(raw, size, channels)
+    loudness, peak_db = measure(samples, rate)
+    gain = compute_gain(loudness, peak_db, target)
+    if gain == 0.0:
+        return raw, gain, loudness, peak_db
+    return from_float(samples * 10 ** (gain / 20), size), gain, loudness, peak_db
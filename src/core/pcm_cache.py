@@ -0,0 +1,284 @@
+import hashlib
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+from collections import OrderedDict
+import pygame
+from . import normalizer
+from ..utils.logger import logger
+
+CACHE_DIR = 'cache'
+CACHE_VERSION = 1
+INDEX_FILE = 'index.json'
+DEFAULT_SIZE_LIMIT = 1024 * 1024 * 1024
+HASH_CHUNK = 1024 * 1024
+# 文件头：标识、版本、采样率、采样格式、声道数、增益、响度、峰值
+HEADER = struct.Struct('<4sHiiifff')
+MAGIC = b'LKSP'
+
+
+def content_hash(path):
+    """计算文件内容的哈希值"""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class PCMCache:
+    """导入时预处理的 PCM 磁盘缓存
+
+    首次加载音频时由 pygame 解码并转换为混音器格式（采样率、位深、声道数），
+    按需测量响度并应用增益，结果写入缓存目录。之后的加载通过 mmap 映射缓存文件，
+    用 Sound(buffer=...) 直接复制 PCM 数据，不再解码和重采样。
+
+    缓存文件以（文件内容哈希, 混音器格式, 响度设置）命名，内容相同的文件共享一份缓存。
+    索引记录每个源文件的修改时间和大小，未变化时直接复用上次的内容哈希；
+    源文件变化后重新计算哈希，不再被引用的旧缓存文件会被删除。
+    缓存总大小超出上限时按最近最少使用清理。
+    """
+
+    def __init__(self, cache_dir=CACHE_DIR, size_limit=DEFAULT_SIZE_LIMIT):
+        self.cache_dir = cache_dir
+        self.size_limit = size_limit
+        self.enabled = True
+        self.normalize = False
+        self.target_loudness = normalizer.DEFAULT_TARGET_LOUDNESS
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._dirty = False
+        self._sources = {}              # 源文件绝对路径 -> [修改时间, 大小, 内容哈希]
+        self._entries = OrderedDict()   # 缓存文件名 -> [字节数, 最近使用时间]，按使用顺序排列
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.write_errors = 0
+
+    def configure(self, enabled=True, normalize=False, target_loudness=normalizer.DEFAULT_TARGET_LOUDNESS,
+                  size_limit=None):
+        """更新缓存设置，返回处理结果是否会因此改变"""
+        target_loudness = float(target_loudness)
+        changed = (normalize != self.normalize or
+                   (normalize and target_loudness != self.target_loudness))
+        self.enabled = enabled
+        self.normalize = normalize
+        self.target_loudness = target_loudness
+        if size_limit is not None:
+            with self._lock:
+                self.size_limit = size_limit
+                if self._loaded:
+                    self._evict()
+        return changed
+
+    def _ensure_loaded(self):
+        """首次使用时读取索引（需持有锁）"""
+        if self._loaded:
+            return
+        self._loaded = True
+        index = {}
+        try:
+            with open(os.path.join(self.cache_dir, INDEX_FILE), 'r', encoding='utf-8') as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            pass
+        indexed = {}
+        if index.get('version') == CACHE_VERSION:
+            self._sources = index.get('sources', {})
+            indexed = index.get('entries', {})
+
+        # 以目录中实际存在的文件为准，索引中没有的文件（例如退出时仍在写入的）以修改时间作为最近使用时间
+        try:
+            names = [name for name in os.listdir(self.cache_dir) if name.endswith('.pcm')]
+        except OSError:
+            names = []
+        entries = []
+        for name in names:
+            if name in indexed:
+                entries.append((name, list(indexed[name])))
+                continue
+            try:
+                stat = os.stat(os.path.join(self.cache_dir, name))
+            except OSError:
+                continue
+            entries.append((name, [stat.st_size, stat.st_mtime]))
+            self._dirty = True
+        entries.sort(key=lambda item: item[1][1])
+        self._entries = OrderedDict(entries)
+        self.total_bytes = sum(size for size, _ in self._entries.values())
+
+    def _source_hash(self, abs_path):
+        """获取源文件的内容哈希，修改时间和大小未变化时复用索引中的值"""
+        stat = os.stat(abs_path)
+        with self._lock:
+            self._ensure_loaded()
+            record = self._sources.get(abs_path)
+            if record is not None and record[0] == stat.st_mtime_ns and record[1] == stat.st_size:
+                return record[2]
+
+        digest = content_hash(abs_path)
+        with self._lock:
+            old = self._sources.get(abs_path)
+            self._sources[abs_path] = [stat.st_mtime_ns, stat.st_size, digest]
+            self._dirty = True
+            if old is not None and old[2] != digest:
+                self._drop_unreferenced(old[2])
+        return digest
+
+    def _drop_unreferenced(self, digest):
+        """源文件内容变化后，删除不再被任何源文件引用的旧缓存（需持有锁）"""
+        if any(record[2] == digest for record in self._sources.values()):
+            return
+        for name in [name for name in self._entries if name.startswith(digest)]:
+            self._remove_entry(name)
+
+    def _remove_entry(self, name):
+        """删除一个缓存文件（需持有锁）"""
+        size, _ = self._entries.pop(name)
+        self.total_bytes -= size
+        self._dirty = True
+        try:
+            os.remove(os.path.join(self.cache_dir, name))
+        except OSError:
+            pass
+
+    def cache_name(self, digest, mixer_format):
+        """缓存文件名：内容哈希加上混音器格式和响度设置"""
+        settings = self.target_loudness if self.normalize else None
+        variant = hashlib.blake2b(f"{mixer_format}|{settings}".encode('utf-8'), digest_size=8).hexdigest()
+        return f"{digest}-{variant}.pcm"
+
+    def load(self, path):
+        """加载音频文件对应的 Sound，优先使用磁盘缓存"""
+        mixer_format = pygame.mixer.get_init()
+        if not self.enabled or not mixer_format:
+            return pygame.mixer.Sound(path)
+
+        abs_path = os.path.abspath(path)
+        name = self.cache_name(self._source_hash(abs_path), mixer_format)
+        sound = self._read(name, mixer_format)
+        if sound is not None:
+            return sound
+
+        with self._lock:
+            self.misses += 1
+        sound = pygame.mixer.Sound(abs_path)
+        raw = sound.get_raw()
+        gain = loudness = peak = 0.0
+        if self.normalize:
+            raw, gain, loudness, peak = normalizer.normalize(raw, mixer_format, self.target_loudness)
+            if gain != 0.0:
+                sound = pygame.mixer.Sound(buffer=raw)
+        self._write(name, mixer_format, raw, gain, loudness, peak)
+        return sound
+
+    def _read(self, name, mixer_format):
+        """通过 mmap 读取缓存文件，不存在或格式不符时返回 None"""
+        path = os.path.join(self.cache_dir, name)
+        try:
+            with open(path, 'rb') as f:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                    if len(data) < HEADER.size:
+                        return None
+                    magic, version, rate, size, channels, _, _, _ = HEADER.unpack_from(data)
+                    if magic != MAGIC or version != CACHE_VERSION or (rate, size, channels) != tuple(mixer_format):
+                        return None
+                    # Sound 会复制缓冲区，释放视图后即可关闭映射
+                    with memoryview(data) as view, view[HEADER.size:] as pcm:
+                        sound = pygame.mixer.Sound(buffer=pcm)
+        except (OSError, ValueError):
+            return None
+
+        with self._lock:
+            self.hits += 1
+            entry = self._entries.get(name)
+            if entry is None:
+                entry = self._entries[name] = [os.path.getsize(path), 0]
+                self.total_bytes += entry[0]
+            entry[1] = time.time()
+            self._entries.move_to_end(name)
+            self._dirty = True
+        return sound
+
+    def _write(self, name, mixer_format, raw, gain, loudness, peak):
+        """写入缓存文件，先写临时文件再替换，避免其他线程读到不完整的数据"""
+        rate, size, channels = mixer_format
+        header = HEADER.pack(MAGIC, CACHE_VERSION, rate, size, channels, gain, loudness,
+                             peak if peak != float('-inf') else normalizer.ABSOLUTE_GATE)
+        path = os.path.join(self.cache_dir, name)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            with open(tmp_path, 'wb') as f:
+                f.write(header)
+                f.write(raw)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            with self._lock:
+                self.write_errors += 1
+            logger.warning("写入音频缓存失败: %s", e)
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            return
+
+        with self._lock:
+            old = self._entries.pop(name, None)
+            if old is not None:
+                self.total_bytes -= old[0]
+            self._entries[name] = [HEADER.size + len(raw), time.time()]
+            self.total_bytes += HEADER.size + len(raw)
+            self._dirty = True
+            self._evict(keep=name)
+
+    def _evict(self, keep=None):
+        """超出大小上限时删除最近最少使用的缓存文件（需持有锁）"""
+        for name in list(self._entries):
+            if self.total_bytes <= self.size_limit:
+                break
+            if name != keep:
+                self._remove_entry(name)
+                self.evictions += 1
+
+    def save_index(self):
+        """把索引写入缓存目录，没有变化时不写入"""
+        with self._lock:
+            if not self._dirty:
+                return
+            index = {
+                'version': CACHE_VERSION,
+                'sources': dict(self._sources),
+                'entries': {name: list(entry) for name, entry in self._entries.items()},
+            }
+            self._dirty = False
+        path = os.path.join(self.cache_dir, INDEX_FILE)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(index, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning("写入音频缓存索引失败: %s", e)
+
+    def get_stats(self):
+        """获取缓存统计信息"""
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'total_bytes': self.total_bytes,
+                'size_limit': self.size_limit,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'write_errors': self.write_errors,
+            }
+
+
+# 全局共享的磁盘缓存实例
+pcm_cache = PCMCache()
@@ -0,0 +1,196 @@
+import os
+import struct
+import sys
+import threading
+import time
+import keyboard
+
+MAGIC = b'LKSR'
+VERSION = 1
+FILE_HEADER = struct.Struct('<4sH')
+# 每个事件：距上一事件的微秒数、扫描码、标志位、名称编号
+RECORD = struct.Struct('<IhBH')
+NAME_LENGTH = struct.Struct('<B')
+
+FLAG_PRESS = 0x01
+FLAG_KEYPAD = 0x02
+FLAG_NEW_NAME = 0x80    # 该名称第一次出现，记录后紧跟名称长度和 UTF-8 字节
+MAX_DELTA_US = 0xFFFFFFFF
+
+
+class RecordedEvent:
+    """回放用的按键事件，字段与 keyboard.KeyboardEvent 一致"""
+    __slots__ = ('event_type', 'scan_code', 'name', 'time', 'is_keypad')
+
+    def __init__(self, event_type, scan_code, name, time=0.0, is_keypad=False):
+        self.event_type = event_type
+        self.scan_code = scan_code
+        self.name = name
+        self.time = time
+        self.is_keypad = is_keypad
+
+
+class KeyRecorder:
+    """把键盘会话录制为紧凑的二进制日志
+
+    每个事件占 9 字节（时间间隔、扫描码、按下/松开、名称编号），
+    按键名称只在第一次出现时写入一次。键盘钩子线程中只做打包和缓冲写入。
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.count = 0
+        self._file = None
+        self._hook = None
+        self._names = {}
+        self._last = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        """开始录制"""
+        self._file = open(self.path, 'wb')
+        self._file.write(FILE_HEADER.pack(MAGIC, VERSION))
+        self._hook = keyboard.hook(self.record)
+
+    def record(self, event, now=None):
+        """记录一个按键事件，now 为 time.perf_counter() 时间戳"""
+        if now is None:
+            now = time.perf_counter()
+        with self._lock:
+            if self._file is None:
+                return
+            delta = 0 if self._last is None else int((now - self._last) * 1_000_000)
+            self._last = now
+            flags = FLAG_PRESS if event.event_type == keyboard.KEY_DOWN else 0
+            if getattr(event, 'is_keypad', False):
+                flags |= FLAG_KEYPAD
+            name = event.name or ''
+            name_id = self._names.get(name)
+            encoded = None
+            if name_id is None:
+                name_id = self._names[name] = len(self._names)
+                encoded = name.encode('utf-8')[:255]
+                flags |= FLAG_NEW_NAME
+            scan_code = max(-0x8000, min(0x7FFF, event.scan_code or 0))
+            self._file.write(RECORD.pack(min(delta, MAX_DELTA_US), scan_code, flags, name_id))
+            if encoded is not None:
+                self._file.write(NAME_LENGTH.pack(len(encoded)))
+                self._file.write(encoded)
+            self.count += 1
+
+    def stop(self):
+        """停止录制并关闭文件，本次调用关闭了文件时返回 True"""
+        if self._hook is not None:
+            keyboard.unhook(self._hook)
+            self._hook = None
+        with self._lock:
+            if self._file is None:
+                return False
+            self._file.close()
+            self._file = None
+            return True
+
+
+def read_log(path):
+    """读取录制日志，返回 [(相对开始时间（秒）, RecordedEvent)]"""
+    with open(path, 'rb') as f:
+        data = f.read()
+    if len(data) < FILE_HEADER.size:
+        raise ValueError("无效的录制文件")
+    magic, version = FILE_HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError("无效的录制文件")
+
+    events = []
+    names = []
+    offset = FILE_HEADER.size
+    elapsed_us = 0
+    while offset + RECORD.size <= len(data):
+        delta, scan_code, flags, name_id = RECORD.unpack_from(data, offset)
+        offset += RECORD.size
+        if flags & FLAG_NEW_NAME:
+            if offset + NAME_LENGTH.size > len(data):
+                raise ValueError("损坏的录制文件")
+            (length,) = NAME_LENGTH.unpack_from(data, offset)
+            offset += NAME_LENGTH.size
+            if offset + length > len(data):
+                raise ValueError("损坏的录制文件")
+            names.append(data[offset:offset + length].decode('utf-8', 'replace'))
+            offset += length
+        if name_id >= len(names):
+            raise ValueError("损坏的录制文件")
+        elapsed_us += delta
+        seconds = elapsed_us / 1_000_000
+        event_type = keyboard.KEY_DOWN if flags & FLAG_PRESS else keyboard.KEY_UP
+        events.append((seconds, RecordedEvent(event_type, scan_code, names[name_id], seconds,
+                                              bool(flags & FLAG_KEYPAD))))
+    return events
+
+
+def replay(player, events, speed=1.0):
+    """把录制的事件注入播放器
+
+    speed 为回放速度倍数，0 表示不等待、以最快速度注入。
+    事件通过 on_keyboard_press / on_keyboard_release 进入与真实钩子相同的处理路径，
+    返回实际用时（秒）。
+    """
+    started = time.perf_counter()
+    for offset, event in events:
+        if speed > 0:
+            target = started + offset / speed
+            remaining = target - time.perf_counter()
+            # 先粗略休眠，最后 2 毫秒忙等，保证事件间隔准确
+            if remaining > 0.002:
+                time.sleep(remaining - 0.002)
+            while time.perf_counter() < target:
+                pass
+        if event.event_type == keyboard.KEY_DOWN:
+            player.on_keyboard_press(event)
+        else:
+            player.on_keyboard_release(event)
+    return time.perf_counter() - started
+
+
+def wait_dispatched(player, timeout=30.0):
+    """等待分发线程处理完所有已入队的事件"""
+    deadline = time.monotonic() + timeout
+    while player.dispatcher.dispatched < player.event_queue.enqueued:
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.001)
+    return True
+
+
+def run_replay(path, speed=1.0):
+    """回放录制文件并输出统计结果，不安装键盘钩子，也不需要声卡"""
+    # 没有指定音频驱动时使用 SDL 的 dummy 驱动，不输出声音
+    os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+    from .events import EventBus
+    from .sound_player import SoundPlayer
+
+    try:
+        events = read_log(path)
+    except (OSError, ValueError) as e:
+        print(f"[错误] 读取录制文件失败: {str(e)}", file=sys.stderr)
+        return 1
+
+    player = SoundPlayer(EventBus())
+    while player.is_loading():
+        time.sleep(0.01)
+    # 只在本次回放中开启延迟统计，不写入配置
+    player.latency.enabled = True
+    player.toggle_running(hook=False)
+    try:
+        elapsed = replay(player, events, speed)
+        wait_dispatched(player)
+    finally:
+        player.toggle_running()
+        player.sound_loader.shutdown()
+
+    print(f"回放事件 {len(events)} 个，用时 {elapsed:.3f} 秒")
+    print(f"按键过滤: {player.get_input_stats()}")
+    print(f"事件队列: {player.get_queue_stats()}")
+    for stage, stats in player.latency.get_summary().items():
+        print(f"延迟 {stage}: 样本 {stats['count']}，p50 {stats['p50']:.3f} ms，"
+              f"p95 {stats['p95']:.3f} ms，p99 {stats['p99']:.3f} ms，最大 {stats['max']:.3f} ms")
+    return 0
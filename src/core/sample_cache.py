@@ -0,0 +1,115 @@
+import os
+import threading
+from collections import OrderedDict
+import pygame
+from .pcm_cache import pcm_cache
+from .scene_pack import pack_store, is_pack_ref, split_ref, SEPARATOR
+
+
+class SampleCache:
+    """进程级的已解码音频缓存
+
+    以（绝对路径, 修改时间, 文件大小, 混音器格式）为键缓存 pygame.mixer.Sound，音效包条目以音效包文件为准，
+    多个场景引用同一个文件时共享同一份解码数据；超出内存预算时按最近最少使用淘汰。
+    被淘汰的 Sound 如果仍被某个场景引用，会在引用释放后才真正回收。
+    """
+
+    def __init__(self, budget_bytes=256 * 1024 * 1024):
+        self.budget_bytes = budget_bytes
+        self._entries = OrderedDict()   # 缓存键 -> (Sound, 字节数)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.resident_bytes = 0
+
+    @staticmethod
+    def make_key(path):
+        """生成缓存键，文件不存在时抛出 OSError"""
+        if is_pack_ref(path):
+            # 音效包条目以音效包文件的修改时间和大小判断是否变化
+            pack_path, member = split_ref(path)
+            abs_path = os.path.abspath(pack_path)
+            stat = os.stat(abs_path)
+            return (abs_path + SEPARATOR + member, stat.st_mtime_ns, stat.st_size, pygame.mixer.get_init())
+        abs_path = os.path.abspath(path)
+        stat = os.stat(abs_path)
+        return (abs_path, stat.st_mtime_ns, stat.st_size, pygame.mixer.get_init())
+
+    @staticmethod
+    def sound_size(sound):
+        """计算 Sound 占用的字节数"""
+        try:
+            return memoryview(sound).nbytes
+        except TypeError:
+            return len(sound.get_raw())
+
+    def get(self, path):
+        """获取音频文件对应的 Sound，未命中时解码并放入缓存"""
+        key = self.make_key(path)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+
+        # 解码不持有锁，避免阻塞其他线程的缓存命中
+        sound = pack_store.load(key[0]) if is_pack_ref(key[0]) else pcm_cache.load(key[0])
+        size = self.sound_size(sound)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                # 其他线程已经解码了同一个文件，使用先放入的那份
+                self._entries.move_to_end(key)
+                return entry[0]
+            self._entries[key] = (sound, size)
+            self.resident_bytes += size
+            self._evict()
+        return sound
+
+    def contains(self, path):
+        """检查文件是否已在缓存中（不影响淘汰顺序）"""
+        try:
+            key = self.make_key(path)
+        except OSError:
+            return False
+        with self._lock:
+            return key in self._entries
+
+    def set_budget(self, budget_bytes):
+        """设置内存预算并立即淘汰超出部分"""
+        with self._lock:
+            self.budget_bytes = budget_bytes
+            self._evict()
+
+    def clear(self):
+        """清空缓存"""
+        with self._lock:
+            self._entries.clear()
+            self.resident_bytes = 0
+
+    def _evict(self):
+        # 至少保留最近使用的一项，避免单个大文件超出预算时反复解码
+        while self.resident_bytes > self.budget_bytes and len(self._entries) > 1:
+            _, (_, size) = self._entries.popitem(last=False)
+            self.resident_bytes -= size
+            self.evictions += 1
+
+    def get_stats(self):
+        """获取缓存统计信息"""
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'resident_bytes': self.resident_bytes,
+                'budget_bytes': self.budget_bytes,
+            }
+
+
+# 全局共享的缓存实例
+sample_cache = SampleCache()
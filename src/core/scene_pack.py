@@ -0,0 +1,330 @@
+import io
+import json
+import mmap
+import os
+import shutil
+import struct
+import threading
+import pygame
+from .pcm_cache import pcm_cache
+from . import normalizer
+
+PACK_EXT = '.lkpack'
+PACKS_DIR = 'packs'
+PACK_VERSION = 1
+# 文件头：标识、版本、保留、索引偏移、索引长度
+HEADER = struct.Struct('<4sHHQQ')
+MAGIC = b'LKPK'
+SEPARATOR = '::'        # 按键绑定中音效包路径与包内条目名称的分隔符
+COPY_CHUNK = 1024 * 1024
+
+CODEC_PCM = 'pcm'       # 按混音器格式预解码的 PCM 数据
+CODEC_FILE = 'file'     # 原始的压缩音频文件
+
+
+def is_pack_ref(sound_path):
+    """按键绑定的路径是否指向音效包中的条目"""
+    return PACK_EXT + SEPARATOR in sound_path
+
+
+def make_ref(pack_path, member):
+    """生成指向音效包条目的路径，形如 packs/name.lkpack::member"""
+    return f"{pack_path}{SEPARATOR}{member}"
+
+
+def split_ref(sound_path):
+    """把音效包条目路径拆分为 (音效包路径, 条目名称)"""
+    index = sound_path.index(PACK_EXT + SEPARATOR) + len(PACK_EXT)
+    return sound_path[:index], sound_path[index + len(SEPARATOR):]
+
+
+class ScenePack:
+    """只读打开的音效包
+
+    音效包由文件头、按顺序排列的音频数据和末尾的 JSON 索引组成。
+    打开时只打开一次文件并映射到内存，之后每个条目都直接从映射中切片读取：
+    预解码的条目用 Sound(buffer=...) 复制 PCM 数据，压缩的条目交给 pygame 在内存中解码。
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            self.scene, self.entries = parse_index(self._map, len(self._map))
+        except ValueError:
+            self._map.close()
+            raise
+
+    def load(self, member):
+        """加载包内的一个条目，返回 Sound"""
+        entry = self.entries.get(member)
+        if entry is None:
+            raise OSError(f"音效包中没有条目 {member}")
+        start = entry['offset']
+        end = start + entry['length']
+        with memoryview(self._map) as view, view[start:end] as data:
+            if entry['codec'] == CODEC_PCM:
+                if tuple(entry['format']) != tuple(pygame.mixer.get_init() or ()):
+                    raise OSError("音效包的预解码格式与当前混音器格式不一致，请使用压缩格式导出")
+                return pygame.mixer.Sound(buffer=data)
+            sound = pygame.mixer.Sound(file=io.BytesIO(data))
+        if pcm_cache.normalize:
+            raw, gain, _, _ = normalizer.normalize(sound.get_raw(), pygame.mixer.get_init(),
+                                                   pcm_cache.target_loudness)
+            if gain != 0.0:
+                sound = pygame.mixer.Sound(buffer=raw)
+        return sound
+
+    def read(self, member):
+        """读取条目的原始数据，重新导出时使用"""
+        entry = self.entries[member]
+        return self._map[entry['offset']:entry['offset'] + entry['length']]
+
+    def close(self):
+        self._map.close()
+
+
+def parse_index(data, size):
+    """从文件开头的数据中解析文件头和索引，返回 (场景, 条目)"""
+    if size < HEADER.size:
+        raise ValueError("无效的音效包文件")
+    magic, version, _, index_offset, index_length = HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError("无效的音效包文件")
+    if version != PACK_VERSION:
+        raise ValueError(f"不支持的音效包版本: {version}")
+    if index_offset < HEADER.size or index_offset + index_length > size:
+        raise ValueError("音效包文件不完整")
+    try:
+        index = json.loads(bytes(data[index_offset:index_offset + index_length]).decode('utf-8'))
+        scene = index['scene']
+        entries = index['entries']
+        for entry in entries.values():
+            if entry['offset'] < HEADER.size or entry['offset'] + entry['length'] > index_offset:
+                raise ValueError
+            if entry['codec'] not in (CODEC_PCM, CODEC_FILE):
+                raise ValueError
+            # 预解码条目需要 (采样率, 采样格式, 声道数)，加载时与混音器格式比较
+            if entry['codec'] == CODEC_PCM:
+                fmt = entry['format']
+                if not isinstance(fmt, list) or len(fmt) != 3 or any(type(v) is not int for v in fmt):
+                    raise ValueError
+    except (ValueError, KeyError, TypeError, AttributeError):
+        raise ValueError("音效包索引已损坏")
+    if not isinstance(scene, dict):
+        raise ValueError("音效包索引已损坏")
+    return scene, entries
+
+
+class PackStore:
+    """进程内已打开的音效包
+
+    每个音效包文件只打开一次，多个按键、多个场景共用同一个映射；
+    文件被替换（修改时间或大小变化）后重新打开。
+    """
+
+    def __init__(self):
+        self._packs = {}    # 绝对路径 -> (修改时间, 大小, ScenePack)
+        self._lock = threading.Lock()
+        self.opens = 0      # 打开音效包文件的次数
+
+    def get(self, pack_path):
+        """获取已打开的音效包，文件不存在或无效时抛出 OSError"""
+        abs_path = os.path.abspath(pack_path)
+        stat = os.stat(abs_path)
+        with self._lock:
+            record = self._packs.get(abs_path)
+            if record is not None and record[0] == stat.st_mtime_ns and record[1] == stat.st_size:
+                return record[2]
+            try:
+                pack = ScenePack(abs_path)
+            except ValueError as e:
+                raise OSError(str(e))
+            self.opens += 1
+            self._packs[abs_path] = (stat.st_mtime_ns, stat.st_size, pack)
+            # 旧的映射可能仍有 Sound 在使用复制出的数据，映射本身不再需要
+            if record is not None:
+                record[2].close()
+            return pack
+
+    def load(self, sound_path):
+        """加载音效包条目路径对应的 Sound"""
+        pack_path, member = split_ref(sound_path)
+        return self.get(pack_path).load(member)
+
+    def close(self, pack_path):
+        """关闭音效包，删除或覆盖文件之前调用"""
+        with self._lock:
+            record = self._packs.pop(os.path.abspath(pack_path), None)
+        if record is not None:
+            record[2].close()
+
+
+def export_pack(scene, filepath, decode=None):
+    """把场景和其中的音频导出为音效包
+
+    音频逐个写入文件，不会同时读入内存。提供 decode 时写入预解码的 PCM 数据（decode(路径) 返回 Sound），
+    否则写入原始的音频文件。多个按键引用同一个文件时只写入一份。
+    返回无法导出的绑定列表 [(路径, 错误信息)]，这些绑定不会出现在音效包中。
+    """
+    tmp_path = filepath + '.tmp'
+    try:
+        errors = _write_pack(tmp_path, scene, decode)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+    pack_store.close(filepath)
+    os.replace(tmp_path, filepath)
+    return errors
+
+
+def _write_pack(tmp_path, scene, decode):
+    """按顺序写入文件头占位、音频数据和索引，最后回填文件头
+
+    按键绑定和按键序列中的音频都写入音效包，索引中的路径改写为条目名称。
+    """
+    entries = {}
+    members = {}        # 源路径 -> 条目名称
+    key_sounds = {}
+    key_options = {}
+    errors = []
+    with open(tmp_path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, PACK_VERSION, 0, 0, 0))
+
+        def add(sound_path):
+            """写入一个音频，同一个源路径只写入一份，返回条目名称"""
+            member = members.get(sound_path)
+            if member is None:
+                entry = _write_entry(f, sound_path, decode)
+                member = _unique_name(entries, sound_path)
+                entries[member] = entry
+                members[sound_path] = member
+            return member
+
+        for key, sound_path in scene['key_sounds'].items():
+            try:
+                key_sounds[key] = add(sound_path)
+            except (pygame.error, OSError) as e:
+                errors.append((sound_path, str(e)))
+
+        for key, options in scene.get('key_options', {}).items():
+            if key not in key_sounds:
+                continue
+            options = dict(options)
+            if options.get('sequence'):
+                steps = []
+                for step in options['sequence']:
+                    try:
+                        steps.append(dict(step, sound=add(step['sound'])))
+                    except (pygame.error, OSError) as e:
+                        # 缺少其中一步会打乱之后各步的时间，整个序列不导出
+                        errors.append((step['sound'], str(e)))
+                        steps = None
+                        break
+                if steps is None:
+                    del options['sequence']
+                else:
+                    options['sequence'] = steps
+            if options:
+                key_options[key] = options
+
+        index = {
+            'scene': {
+                'name': scene['name'],
+                'key_sounds': key_sounds,
+                'key_options': key_options,
+            },
+            'entries': entries,
+        }
+        index_offset = f.tell()
+        data = json.dumps(index, ensure_ascii=False).encode('utf-8')
+        f.write(data)
+        f.seek(0)
+        f.write(HEADER.pack(MAGIC, PACK_VERSION, 0, index_offset, len(data)))
+    return errors
+
+
+def _write_entry(f, sound_path, decode):
+    """写入一个条目的音频数据，返回索引项"""
+    offset = f.tell()
+    if is_pack_ref(sound_path):
+        # 来自其他音效包的条目原样复制
+        pack_path, member = split_ref(sound_path)
+        pack = pack_store.get(pack_path)
+        entry = dict(pack.entries[member]) if member in pack.entries else None
+        if entry is None:
+            raise OSError(f"音效包中没有条目 {member}")
+        if decode is None or entry['codec'] == CODEC_PCM:
+            f.write(pack.read(member))
+            entry['offset'] = offset
+            return entry
+    if decode is not None:
+        raw = decode(sound_path).get_raw()
+        f.write(raw)
+        return {'codec': CODEC_PCM, 'offset': offset, 'length': len(raw),
+                'format': list(pygame.mixer.get_init())}
+    with open(sound_path, 'rb') as source:
+        shutil.copyfileobj(source, f, COPY_CHUNK)
+    return {'codec': CODEC_FILE, 'offset': offset, 'length': f.tell() - offset}
+
+
+def _unique_name(entries, sound_path):
+    """以文件名作为条目名称，重名时加上序号"""
+    name = os.path.basename(split_ref(sound_path)[1] if is_pack_ref(sound_path) else sound_path)
+    base, ext = os.path.splitext(name)
+    count = 1
+    while name in entries:
+        count += 1
+        name = f"{base}-{count}{ext}"
+    return name
+
+
+def install_pack(filepath, packs_dir=PACKS_DIR):
+    """校验音效包并复制到程序的音效包目录
+
+    只读取文件头和索引做校验，音频数据按块复制。返回 (安装后的路径, 场景)，
+    场景中的按键绑定已指向安装后的音效包。
+    """
+    with open(filepath, 'rb') as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            scene, entries = parse_index(data, len(data))
+
+    os.makedirs(packs_dir, exist_ok=True)
+    base = os.path.splitext(os.path.basename(filepath))[0]
+    target = os.path.join(packs_dir, base + PACK_EXT)
+    count = 1
+    while os.path.exists(target):
+        if os.path.abspath(target) == os.path.abspath(filepath):
+            break
+        count += 1
+        target = os.path.join(packs_dir, f"{base}-{count}{PACK_EXT}")
+    if os.path.abspath(target) != os.path.abspath(filepath):
+        tmp_path = target + '.tmp'
+        with open(filepath, 'rb') as source, open(tmp_path, 'wb') as dest:
+            shutil.copyfileobj(source, dest, COPY_CHUNK)
+        os.replace(tmp_path, target)
+
+    target = target.replace(os.sep, '/')
+    key_sounds = scene.get('key_sounds')
+    if isinstance(key_sounds, dict):
+        scene['key_sounds'] = {key: make_ref(target, member) if type(member) is str else member
+                               for key, member in key_sounds.items()}
+    # 按键序列中的步骤同样指向包内的条目，不是条目名称的路径（早期导出的音效包）保持不变
+    key_options = scene.get('key_options')
+    if isinstance(key_options, dict):
+        for options in key_options.values():
+            steps = options.get('sequence') if isinstance(options, dict) else None
+            if not isinstance(steps, list):
+                continue
+            for step in steps:
+                if isinstance(step, dict) and type(step.get('sound')) is str and step['sound'] in entries:
+                    step['sound'] = make_ref(target, step['sound'])
+    return target, scene
+
+
+# 全局共享的音效包实例
+pack_store = PackStore()
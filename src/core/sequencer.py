@@ -0,0 +1,154 @@
+import heapq
+import itertools
+import threading
+import time
+
+SPIN_THRESHOLD = 0.002      # 距离到期不足该时间（秒）时改为忙等，保证触发时间准确
+
+
+class SequenceStep:
+    """序列中的一步：上一步开始后等待 delay 秒播放 sound，loop 不为 None 时每隔 loop 秒重复播放"""
+    __slots__ = ('delay', 'sound', 'loop')
+
+    def __init__(self, delay, sound, loop=None):
+        self.delay = delay
+        self.sound = sound      # 音频路径，播放时通过 resolve 取得 Sound
+        self.loop = loop
+
+
+class _Run:
+    """正在执行的一个序列"""
+    __slots__ = ('key', 'steps', 'index', 'cancelled')
+
+    def __init__(self, key, steps):
+        self.key = key
+        self.steps = steps
+        self.index = 0
+        self.cancelled = False
+
+
+class Sequencer:
+    """定时序列的调度线程
+
+    所有序列共用一个后台线程和一个按到期时间排序的堆，时间取自 time.perf_counter（单调、高精度）。
+    线程等待到最近一个到期时间前 2 毫秒，之后忙等到准确的时间再触发，
+    同时运行的序列再多也只有这一个线程。同一按键再次触发时取消它正在执行的序列，
+    取消只做标记，堆中的过期条目在取出时直接丢弃。
+    每一步以 (按键, 步骤序号) 作为声部键播放，不占用触发按键本身的复音数。
+    """
+
+    def __init__(self, play, resolve):
+        self.play = play            # play(声部键, sound)，在调度线程中调用，声部键为 (按键, 步骤序号)
+        self.resolve = resolve      # resolve(path) -> Sound 或 None
+        self._heap = []             # (到期时间, 序号, _Run)
+        self._counter = itertools.count()
+        self._runs = {}             # 按键 -> 正在执行的 _Run
+        self._condition = threading.Condition()
+        self._thread = None
+        self._closed = False
+        self.fired = 0              # 已触发的步数
+        self.skipped = 0            # 音频未就绪而跳过的步数
+        self.max_late = 0.0         # 触发时间相对计划时间的最大延迟（秒）
+
+    def start(self, key, steps, now=None):
+        """开始执行按键的序列，now 为按键触发的时间"""
+        if now is None:
+            now = time.perf_counter()
+        run = _Run(key, steps)
+        with self._condition:
+            if self._closed:
+                return
+            previous = self._runs.get(key)
+            if previous is not None:
+                previous.cancelled = True
+            self._runs[key] = run
+            heapq.heappush(self._heap, (now + steps[0].delay, next(self._counter), run))
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._loop, name='Sequencer', daemon=True)
+                self._thread.start()
+            self._condition.notify()
+
+    def cancel(self, key):
+        """取消按键正在执行的序列"""
+        with self._condition:
+            run = self._runs.pop(key, None)
+            if run is not None:
+                run.cancelled = True
+
+    def cancel_all(self):
+        """取消所有序列"""
+        with self._condition:
+            for run in self._runs.values():
+                run.cancelled = True
+            self._runs.clear()
+            self._heap.clear()
+
+    def active_count(self):
+        """正在执行的序列数量"""
+        with self._condition:
+            return len(self._runs)
+
+    def shutdown(self):
+        """停止调度线程"""
+        with self._condition:
+            self._closed = True
+            self._heap.clear()
+            self._runs.clear()
+            self._condition.notify()
+
+    def _loop(self):
+        while True:
+            with self._condition:
+                while True:
+                    if self._closed:
+                        return
+                    # 丢弃已取消序列的条目
+                    while self._heap and self._heap[0][2].cancelled:
+                        heapq.heappop(self._heap)
+                    if not self._heap:
+                        self._condition.wait()
+                        continue
+                    due = self._heap[0][0]
+                    remaining = due - time.perf_counter()
+                    if remaining <= SPIN_THRESHOLD:
+                        break
+                    self._condition.wait(remaining - SPIN_THRESHOLD)
+
+            while time.perf_counter() < due:
+                pass
+
+            with self._condition:
+                if not self._heap or self._heap[0][0] != due:
+                    continue
+                _, _, run = heapq.heappop(self._heap)
+                if run.cancelled:
+                    continue
+                index = run.index
+                step = run.steps[index]
+                # 安排下一次触发：循环的步骤按间隔重复，否则进入下一步
+                if step.loop is not None:
+                    heapq.heappush(self._heap, (due + step.loop, next(self._counter), run))
+                elif run.index + 1 < len(run.steps):
+                    run.index += 1
+                    heapq.heappush(self._heap, (due + run.steps[run.index].delay, next(self._counter), run))
+                elif self._runs.get(run.key) is run:
+                    del self._runs[run.key]
+
+            late = time.perf_counter() - due
+            if late > self.max_late:
+                self.max_late = late
+            sound = self.resolve(step.sound)
+            if sound is None:
+                self.skipped += 1
+                continue
+            self.play((run.key, index), sound)
+            self.fired += 1
+
+    def get_stats(self):
+        """获取调度统计信息"""
+        return {
+            'active': self.active_count(),
+            'fired': self.fired,
+            'skipped': self.skipped,
+            'max_late_ms': self.max_late * 1000,
+        }
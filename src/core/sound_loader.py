@@ -0,0 +1,182 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import pygame
+from .sample_cache import sample_cache
+from .scene_pack import is_pack_ref
+from ..utils.logger import logger
+
+
+class SoundLoader:
+    """后台音频加载器
+
+    使用线程池解码场景中的音频文件，每个按键解码完成后立即通过回调交给播放器，
+    不必等整个场景加载完毕。每次调用 load 都会开启新的一轮加载，
+    上一轮尚未完成的任务结果会被丢弃。on_loaded 在锁外调用，多个加载线程的回调可以并行执行，
+    回调中不应做耗时处理，需要时通过 run 提交到加载线程。
+    """
+
+    def __init__(self, max_workers=None):
+        if max_workers is None:
+            max_workers = min(4, os.cpu_count() or 1)
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='SoundLoader')
+        # 进度回调在锁内执行以保证顺序，回调中可能再次查询加载器，因此使用可重入锁
+        self._lock = threading.RLock()
+        self.generation = 0     # 当前加载轮次
+        self.total = 0          # 本轮需要加载的数量
+        self.ready = 0          # 本轮已加载完成的数量
+        self.failed = 0         # 本轮加载失败的数量
+        self.errors = []        # 加载失败的文件 (路径, 错误信息)
+        self.on_progress = None  # 本轮加载的进度回调
+        self.prefetching = 0    # 尚未完成的预取和后台任务数
+        self.closed = False
+
+    def load(self, key_sounds, on_loaded, on_progress=None):
+        """开始加载一组按键音频
+
+        on_loaded(key, sound) 和 on_progress(ready, total, done) 都可能在加载线程中回调。
+        """
+        with self._lock:
+            self.generation += 1
+            generation = self.generation
+            self.total = len(key_sounds)
+            self.ready = 0
+            self.failed = 0
+            self.errors = []
+            self.on_progress = on_progress
+            if on_progress and not key_sounds:
+                on_progress(0, 0, True)
+
+        pending = []
+        for key, sound_path in list(key_sounds.items()):
+            # 已在缓存中的音频直接取出，不占用线程池
+            if sample_cache.contains(sound_path):
+                self._load_one(generation, key, sound_path, on_loaded)
+            else:
+                pending.append((key, sound_path))
+
+        for key, sound_path in pending:
+            self.executor.submit(self._load_one, generation, key, sound_path, on_loaded)
+        return generation
+
+    def _load_one(self, generation, key, sound_path, on_loaded):
+        """加载单个音频文件"""
+        if generation != self.generation:
+            return
+
+        sound = None
+        error = None
+        try:
+            if is_pack_ref(sound_path) or os.path.exists(sound_path):
+                sound = sample_cache.get(sound_path)
+            else:
+                error = "音频文件不存在"
+        except (pygame.error, OSError) as e:
+            error = f"加载音频文件失败: {str(e)}"
+        except Exception as e:
+            # 其他异常也要计入本轮进度，否则加载永远不会结束
+            logger.exception("加载音频文件 %s 失败", sound_path)
+            error = f"加载音频文件失败: {str(e) or type(e).__name__}"
+
+        if sound is not None:
+            if generation != self.generation:
+                return
+            try:
+                on_loaded(key, sound)
+            except Exception as e:
+                logger.exception("处理已加载的音频 %s 失败", sound_path)
+                sound = None
+                error = f"加载音频文件失败: {str(e) or type(e).__name__}"
+
+        with self._lock:
+            if generation != self.generation:
+                return
+            if sound is not None:
+                self.ready += 1
+            else:
+                self.failed += 1
+                self.errors.append((sound_path, error))
+            if self.on_progress:
+                self.on_progress(self.ready, self.total, self.ready + self.failed >= self.total)
+
+    def prefetch(self, key_sounds, on_loaded=None):
+        """在后台预取一组音频，不影响当前加载轮次和进度
+
+        未提供 on_loaded 时只把音频解码进缓存；失败的文件直接忽略，
+        真正加载该场景时才会报告错误。
+        """
+        for key, sound_path in list(key_sounds.items()):
+            if on_loaded is None and sample_cache.contains(sound_path):
+                continue
+            with self._lock:
+                self.prefetching += 1
+            self.executor.submit(self._prefetch_one, key, sound_path, on_loaded)
+
+    def _prefetch_one(self, key, sound_path, on_loaded):
+        """预取单个音频文件"""
+        try:
+            if self.closed:
+                return
+            try:
+                sound = sample_cache.get(sound_path)
+            except (pygame.error, OSError):
+                return
+            if on_loaded is not None:
+                on_loaded(key, sound)
+        except Exception:
+            logger.exception("预取音频文件 %s 失败", sound_path)
+        finally:
+            with self._lock:
+                self.prefetching -= 1
+
+    def run(self, task):
+        """在加载线程中执行一个任务，任务中的异常只记录日志"""
+        if not self.closed:
+            with self._lock:
+                self.prefetching += 1
+            self.executor.submit(self._run_task, task)
+
+    def _run_task(self, task):
+        try:
+            task()
+        except Exception:
+            logger.exception("后台加载任务失败")
+        finally:
+            with self._lock:
+                self.prefetching -= 1
+
+    def cancel(self):
+        """放弃当前轮次尚未完成的加载"""
+        with self._lock:
+            self.generation += 1
+            self.total = self.ready + self.failed
+            self.on_progress = None
+
+    def get_progress(self):
+        """获取加载进度 (已就绪数量, 总数量)"""
+        with self._lock:
+            return self.ready, self.total
+
+    def is_done(self):
+        """当前轮次是否已全部处理完成"""
+        with self._lock:
+            return self.ready + self.failed >= self.total
+
+    def is_idle(self):
+        """当前轮次、预取和后台任务是否都已完成"""
+        with self._lock:
+            return self.ready + self.failed >= self.total and self.prefetching == 0
+
+    def pop_errors(self):
+        """取出并清空加载错误列表"""
+        with self._lock:
+            errors = self.errors
+            self.errors = []
+            return errors
+
+    def shutdown(self):
+        """停止加载器"""
+        with self._lock:
+            self.generation += 1
+            self.closed = True
+        self.executor.shutdown(wait=False)
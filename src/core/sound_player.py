@@ -1,19 +1,55 @@
 import pygame
 import json
-import os
-from tkinter import messagebox, Toplevel
+import threading
+import time
 import keyboard
-from .config import ConfigManager
+from . import config_schema
+from .config_schema import MODIFIER_NAMES
+from .config import ConfigManager, DebouncedConfigSaver
+from .event_queue import KeyEventQueue, KeyEventDispatcher
+from .events import (EventBus, SoundPlayed, SoundStopped, KeyUnbound, LoadProgress,
+                     LoadError, SceneSwitched, RunningChanged, Message,
+                     BindingsDecoded, BindingsImported)
+from .sample_cache import sample_cache
+from .scene_pack import export_pack, install_pack
+from .bulk_import import plan_folder, decode_all
+from .pcm_cache import pcm_cache
+from .streaming import StreamedSound, should_stream, DEFAULT_STREAM_THRESHOLD_MB
+from .sound_loader import SoundLoader
+from .voice_manager import VoiceManager
+from .latency import LatencyTracker
+from .key_table import KeyTable
+from .key_state import KeyStateFilter
+from .sequencer import Sequencer, SequenceStep
+from . import variants
+from .variants import VariantSet
+from ..utils.logger import logger
+
+# 场景快捷键的数字键到场景标签序号的映射
+SCENE_HOTKEY_DIGITS = {str(i): i - 1 for i in range(1, 10)}
+
+
+def parse_modifiers(text):
+    """把 "CTRL+ALT" 形式的修饰键组合解析为集合，空字符串表示不启用"""
+    names = (part.strip().upper() for part in (text or '').split('+'))
+    return frozenset(MODIFIER_NAMES.get(name, name) for name in names if name)
+
 
 class SoundPlayer:
-    def __init__(self):
+    def __init__(self, events=None, autoload=True):
+        # 播放器不直接操作界面，所有状态变化都以事件的形式发布给订阅者
+        self.events = events if events is not None else EventBus()
+        self.config_saver = DebouncedConfigSaver()
         try:
             pygame.mixer.init()
         except pygame.error as e:
-            messagebox.showerror("错误", f"初始化音频系统失败: {str(e)}")
+            self.show_message('error', "错误", f"初始化音频系统失败: {str(e)}")
         self.key_sounds = {}        # 按键到音频文件路径的映射
-        self.sounds = {}            # 按键到 Sound 对象的映射
-        self.current_playing = None  # 当前播放的声音
+        self.sounds = {}            # 按键到 Sound 对象（或流式播放的 StreamedSound）的映射
+        self.resident_sounds = {}   # 常驻场景ID到其 Sound 映射，切换到这些场景时直接替换引用
+        self.sequences = {}         # 当前场景中按键到后续定时步骤 [SequenceStep] 的映射
+        self.scene_sequences = {}   # 场景ID到其定时序列的映射，切换场景时直接替换引用
+        self.step_sounds = {}       # 序列步骤用到的音频路径到 Sound 的映射
         self.stop_on_unbound = True # 未绑定按键是否停止播放
         self.is_running = False     # 是否正在运行
         self.stop_key = 'SPACE'     # 停止键
@@ -21,165 +57,626 @@ class SoundPlayer:
         self.keyboard_release_listener = None
         self.pressed_keys = set()   # 只记录当前按下的键
         self.long_press_optimize = True  # 添加长按优化设置
-        self.gui = None
-        self.status_label = None
-        self.start_button = None
+        self.input_suspended = False  # 界面有对话框打开时暂停处理按键
         self.scenes = {}           # 所有场景
         self.current_scene = None  # 当前场景ID
+        self.event_queue_size = 256  # 按键事件队列深度
+        self.sample_cache_budget_mb = 256  # 解码音频缓存的内存预算（MB）
+        self.voice_count = 16       # 同时播放的最大声部数
+        self.max_voices_per_key = 2  # 单个按键的最大复音数
+        self.voice_steal_policy = 'oldest'  # 声部抢占策略
+        self.latency = LatencyTracker()  # 按键到播放的延迟统计
+        self.key_table = KeyTable()     # 扫描码到按键名称的转换表，开始监听时构建
+        self.retrigger_interval_ms = 0  # 同一按键两次触发的最小间隔（毫秒）
+        self.key_filter = KeyStateFilter()  # 钩子线程中的重复按键过滤
+        self.scene_hotkey_modifiers = 'CTRL+ALT'  # 场景快捷键的修饰键，与数字 1-9 组合切换场景
+        self._hotkey_modifiers = parse_modifiers(self.scene_hotkey_modifiers)
+        self.held_modifiers = set()  # 当前按住的修饰键（仅在分发线程中访问）
+        self._scene_dirty = False    # 快捷键切换的场景尚未写入配置
+        self.normalize_loudness = False  # 导入音频时统一响度
+        self.target_loudness = -18.0     # 响度统一的目标值（LUFS）
+        self.pcm_cache_size_mb = 1024    # 磁盘音频缓存的大小上限（MB）
+        self.stream_threshold_mb = DEFAULT_STREAM_THRESHOLD_MB  # 超过该大小的音频文件自动流式播放
+        self._prefetch_pending = False  # 已提交但尚未执行的后台预取任务
+        self._warm_scenes = {}      # 已预热解码缓存的场景ID -> (预热时缓存的淘汰次数, 绑定数量)
+        self._renders = {}          # (场景ID, 按键) -> 最新一次提交的变体生成任务标记
+        self._hook_time = 0.0       # 当前处理事件的钩子时间戳（仅在统计开启时更新）
+        self._dispatch_time = 0.0   # 当前处理事件的分发时间戳
         self.load_config()
-        self.load_sounds()
+        # 钩子线程只负责入队，由分发线程处理按键事件
+        self.event_queue = KeyEventQueue(self.event_queue_size)
+        self.dispatcher = KeyEventDispatcher(self.event_queue, self.dispatch_key_event,
+                                             on_lost_priority=self.on_release_lost)
+        self.sound_loader = SoundLoader()
+        self.voice_manager = VoiceManager(self.voice_count, self.max_voices_per_key, self.voice_steal_policy)
+        self.sequencer = Sequencer(self.voice_manager.play, self.step_sounds.get)
+        # autoload 为 False 时由调用方在合适的时机调用 load_sounds
+        if autoload:
+            self.load_sounds()
+    
+    def show_message(self, kind, title, message):
+        """发布需要提示用户的信息，由订阅者决定如何显示"""
+        self.events.publish(Message(kind, title, message))
     
     def load_sounds(self):
-        """加载所有音频文件"""
-        for key, sound_path in self.key_sounds.items():
-            try:
-                if os.path.exists(sound_path):
-                    self.sounds[key] = pygame.mixer.Sound(sound_path)
-                else:
-                    messagebox.showwarning("警告", f"音频文件不存在: {sound_path}")
-            except pygame.error as e:
-                messagebox.showerror("错误", f"加载音频文件失败 {sound_path}: {str(e)}")
+        """在后台加载当前场景的所有音频文件，每个按键解码完成后即可播放"""
+        sounds = {}
+        self.sounds = sounds
+        if self.is_hot_scene(self.current_scene):
+            self.resident_sounds[self.current_scene] = sounds
+        
+        scene_id = self.current_scene
+        
+        def on_loaded(key, sound):
+            self.prepare_sound(sounds, scene_id, key, sound)
+        
+        def on_progress(ready, total, done):
+            self.events.publish(LoadProgress(ready, total, done))
+            if done:
+                pcm_cache.save_index()
+                errors = self.sound_loader.pop_errors()
+                if errors:
+                    self.events.publish(LoadError(errors))
+        
+        streamed, decoded = self.split_streamed(self.current_scene, self.key_sounds)
+        sounds.update(streamed)
+        self.sound_loader.load(decoded, on_loaded, on_progress)
+        self.load_sequences()
+        self.prefetch_scenes()
     
-    def load_config(self):
-        """加载配置"""
-        config = ConfigManager.load_config()
-        self.scenes = config.get('scenes', {})
+    def load_sequences(self):
+        """切换到当前场景的定时序列，每个场景的序列只在第一次用到时生成"""
+        self.sequencer.cancel_all()
+        sequences = self.scene_sequences.get(self.current_scene)
+        if sequences is None:
+            sequences = self.scene_sequences[self.current_scene] = self.build_sequences(self.current_scene)
+        self.sequences = sequences
+    
+    def build_sequences(self, scene_id):
+        """根据场景的按键选项生成定时序列"""
+        scene = self.scenes[scene_id]
+        sequences = {}
+        for key, options in scene.get('key_options', {}).items():
+            steps = options.get('sequence')
+            if steps and key in scene['key_sounds']:
+                sequences[key] = [SequenceStep(step['delay_ms'] / 1000, step['sound'],
+                                               step['loop_ms'] / 1000 if 'loop_ms' in step else None)
+                                  for step in steps]
+        return sequences
+    
+    def prefetch_step_sounds(self):
+        """在后台解码当前场景的序列用到的音频"""
+        paths = {step.sound for steps in self.sequences.values() for step in steps}
+        missing = {path: path for path in paths if path not in self.step_sounds}
+        if missing:
+            self.sound_loader.prefetch(missing, self.step_sounds.__setitem__)
+    
+    def set_key_sequence(self, key, steps):
+        """设置按键触发后的定时序列，steps 为 None 或空列表时取消"""
+        if key not in self.key_sounds:
+            return False
+        key_options = self.scenes[self.current_scene].setdefault('key_options', {})
+        options = key_options.setdefault(key, {})
+        if steps:
+            options['sequence'] = config_schema.OPTION_FIELDS['sequence'](steps)
+        else:
+            options.pop('sequence', None)
+        if not options:
+            del key_options[key]
+        self.scene_sequences.pop(self.current_scene, None)
+        self.load_sequences()
+        self.prefetch_step_sounds()
+        self.save_config()
+        return True
+    
+    def split_streamed(self, scene_id, key_sounds):
+        """把按键绑定分为流式播放的 {按键: StreamedSound} 和需要解码的 {按键: 路径} 两部分"""
+        options = self.scenes[scene_id].get('key_options', {})
+        streamed = {}
+        decoded = {}
+        for key, sound_path in key_sounds.items():
+            if should_stream(sound_path, options.get(key), self.stream_threshold_mb):
+                streamed[key] = StreamedSound(sound_path)
+            else:
+                decoded[key] = sound_path
+        return streamed, decoded
+    
+    def create_sound(self, key, sound_path):
+        """为当前场景的按键加载音频，长音频创建流式播放对象"""
+        options = self.scenes[self.current_scene].get('key_options', {}).get(key)
+        if should_stream(sound_path, options, self.stream_threshold_mb):
+            self._renders.pop((self.current_scene, key), None)
+            self.sounds[key] = StreamedSound(sound_path)
+        else:
+            self.prepare_sound(self.sounds, self.current_scene, key, sample_cache.get(sound_path))
+    
+    def prepare_sound(self, sounds, scene_id, key, sound):
+        """把按键的 Sound 放入 sounds，设置了播放参数（增益、淡入淡出、音高变化）时在加载线程中生成变体
+
+        变体生成完成之前先使用原始的 Sound，调用线程（可能是分发线程）不做任何音频处理。
+        """
+        sounds[key] = sound
+        options = self.scenes.get(scene_id, {}).get('key_options', {}).get(key)
+        # 流式播放的长音频不预先处理
+        if sound.__class__ is StreamedSound or not variants.has_playback_options(options):
+            self._renders.pop((scene_id, key), None)
+        else:
+            self.render_variants(sounds, scene_id, key, lambda: sound)
+    
+    def render_variants(self, sounds, scene_id, key, source):
+        """在加载线程中按按键当前的播放参数生成变体，source() 返回原始的 Sound
+
+        同一按键再次提交时，之前尚未完成的任务结果被丢弃，sounds 中保留原来的内容直到新的变体生成。
+        """
+        token = object()
+        self._renders[(scene_id, key)] = token
         
-        # 如果没有场景，创建一个默认场景
-        if not self.scenes:
-            self.scenes['scene_1'] = {
-                'name': '默认场景',
-                'key_sounds': {}
-            }
+        def render():
+            try:
+                sound = source()
+            except (pygame.error, OSError) as e:
+                self.show_message('error', "错误", f"加载音频失败: {str(e)}")
+                return
+            options = self.scenes.get(scene_id, {}).get('key_options', {}).get(key)
+            result = variants.build(sound, options, pygame.mixer.get_init())
+            if self._renders.get((scene_id, key)) is token:
+                self._renders.pop((scene_id, key), None)
+                sounds[key] = result
+        
+        self.sound_loader.run(render)
+    
+    def set_key_playback(self, key, **options):
+        """设置按键的播放参数，值为 None 表示恢复默认，新的变体在加载线程中生成"""
+        if key not in self.key_sounds:
+            return False
+        key_options = self.scenes[self.current_scene].setdefault('key_options', {})
+        current = key_options.setdefault(key, {})
+        for name, value in options.items():
+            if name not in variants.PLAYBACK_OPTIONS:
+                raise ValueError(f"未知的播放参数: {name}")
+            if value is None:
+                current.pop(name, None)
+            else:
+                current[name] = config_schema.OPTION_FIELDS[name](value)
+        if not current:
+            del key_options[key]
+        sound_path = self.key_sounds[key]
+        if not isinstance(self.sounds.get(key), StreamedSound):
+            self.render_variants(self.sounds, self.current_scene, key, lambda: sample_cache.get(sound_path))
+        self.save_config()
+        return True
+    
+    def get_key_options(self, key):
+        """获取当前场景中按键绑定的选项"""
+        return self.scenes[self.current_scene].get('key_options', {}).get(key, {})
+    
+    def is_streamed(self, key):
+        """按键当前是否使用流式播放"""
+        return isinstance(self.sounds.get(key), StreamedSound)
+    
+    def set_key_stream(self, key, stream):
+        """设置按键是否流式播放，None 表示按文件大小自动选择"""
+        if key not in self.key_sounds:
+            return
+        key_options = self.scenes[self.current_scene].setdefault('key_options', {})
+        options = key_options.setdefault(key, {})
+        if stream is None:
+            options.pop('stream', None)
+        else:
+            options['stream'] = bool(stream)
+        if not options:
+            del key_options[key]
+        try:
+            self.create_sound(key, self.key_sounds[key])
+        except Exception as e:
+            self.show_message('error', "错误", f"加载音频失败: {str(e)}")
+        self.save_config()
+    
+    def is_hot_scene(self, scene_id):
+        """场景是否标记为常驻"""
+        return bool(self.scenes.get(scene_id, {}).get('hot', False))
+    
+    def set_scene_hot(self, scene_id, hot):
+        """标记或取消常驻场景"""
+        if scene_id not in self.scenes:
+            return False
+        if hot:
+            self.scenes[scene_id]['hot'] = True
+            if scene_id == self.current_scene:
+                self.resident_sounds[scene_id] = self.sounds
+            else:
+                self.fill_resident(scene_id)
+        else:
+            self.scenes[scene_id].pop('hot', None)
+            self.resident_sounds.pop(scene_id, None)
+        self.save_config()
+        return True
+    
+    def fill_resident(self, scene_id):
+        """在后台补齐常驻场景中尚未加载的音频"""
+        sounds = self.resident_sounds.setdefault(scene_id, {})
+        key_sounds = self.scenes[scene_id]['key_sounds']
+        if len(sounds) >= len(key_sounds):
+            return
+        missing = {key: path for key, path in key_sounds.items() if key not in sounds}
+        streamed, decoded = self.split_streamed(scene_id, missing)
+        sounds.update(streamed)
         
-        # 设置当前场景
-        self.current_scene = config.get('current_scene')
-        if not self.current_scene or self.current_scene not in self.scenes:
-            self.current_scene = next(iter(self.scenes.keys()))
+        def on_loaded(key, sound):
+            self.prepare_sound(sounds, scene_id, key, sound)
         
+        self.sound_loader.prefetch(decoded, on_loaded)
+    
+    def prefetch_scenes(self):
+        """在加载线程中预取常驻场景和相邻场景
+
+        需要逐个检查文件大小和缓存状态，不在切换场景的线程（可能是分发线程）中执行；
+        连续切换时只保留一个待执行的预取任务，执行时以最新的当前场景为准。
+        """
+        if not self._prefetch_pending:
+            self._prefetch_pending = True
+            self.sound_loader.run(self._prefetch_scenes)
+    
+    def _prefetch_scenes(self):
+        """预取所有常驻场景，以及标签顺序中当前场景的前一个和后一个场景"""
+        self._prefetch_pending = False
+        current = self.current_scene
+        self.prefetch_step_sounds()
+        scene_ids = list(self.scenes)
+        for scene_id in scene_ids:
+            if self.is_hot_scene(scene_id):
+                # 已全部加载的常驻场景直接跳过
+                self.fill_resident(scene_id)
+        if len(scene_ids) < 2 or current not in self.scenes:
+            return
+        index = scene_ids.index(current)
+        for neighbor in {scene_ids[index - 1], scene_ids[(index + 1) % len(scene_ids)]}:
+            if neighbor == current or self.is_hot_scene(neighbor):
+                continue
+            # 非常驻场景只预热解码缓存，切换时全部命中缓存即可同步完成加载；
+            # 预热之后缓存没有淘汰过、绑定也没有变化时不再逐个检查文件
+            key_sounds = self.scenes[neighbor]['key_sounds']
+            state = (sample_cache.evictions, len(key_sounds))
+            if self._warm_scenes.get(neighbor) == state:
+                continue
+            _, decoded = self.split_streamed(neighbor, key_sounds)
+            self.sound_loader.prefetch(decoded)
+            self._warm_scenes[neighbor] = state
+    
+    def get_load_progress(self):
+        """获取音频加载进度 (已就绪数量, 总数量)"""
+        return self.sound_loader.get_progress()
+    
+    def is_loading(self):
+        """是否仍有音频在后台加载"""
+        return not self.sound_loader.is_done()
+    
+    def load_config(self):
+        """加载配置"""
+        config, issues = ConfigManager.load_config()
+        self.apply_config(config)
+        self.report_config_issues(issues)
+    
+    def apply_config(self, config):
+        """应用已迁移和校验的配置，所有字段都已存在且类型正确"""
+        self.scenes = config['scenes']
+        self.current_scene = config['current_scene']
         self.key_sounds = self.scenes[self.current_scene]['key_sounds']
-        self.stop_key = config.get('stop_key', 'SPACE')
-        self.stop_on_unbound = config.get('stop_on_unbound', True)
-        self.long_press_optimize = config.get('long_press_optimize', True)
+        self.stop_key = config['stop_key']
+        self.stop_on_unbound = config['stop_on_unbound']
+        self.long_press_optimize = config['long_press_optimize']
+        self.event_queue_size = config['event_queue_size']
+        self.sample_cache_budget_mb = config['sample_cache_budget_mb']
+        sample_cache.set_budget(self.sample_cache_budget_mb * 1024 * 1024)
+        self.voice_count = config['voice_count']
+        self.max_voices_per_key = config['max_voices_per_key']
+        self.voice_steal_policy = config['voice_steal_policy']
+        self.latency.enabled = config['latency_tracking']
+        self.set_scene_hotkey_modifiers(config['scene_hotkey_modifiers'])
+        self.set_loudness_normalization(config['normalize_loudness'], config['target_loudness'])
+        self.pcm_cache_size_mb = config['pcm_cache_size_mb']
+        self.stream_threshold_mb = config['stream_threshold_mb']
+        self.set_retrigger_interval(config['retrigger_interval_ms'])
+        pcm_cache.configure(normalize=self.normalize_loudness, target_loudness=self.target_loudness,
+                            size_limit=self.pcm_cache_size_mb * 1024 * 1024)
     
-    def save_config(self):
-        """保存配置"""
+    def report_config_issues(self, issues):
+        """把配置校验发现的所有问题合并为一条提示"""
+        if issues:
+            logger.warning("配置中有 %d 处问题已自动修正", len(issues))
+            self.show_message('warning', "配置问题",
+                              f"配置中有 {len(issues)} 处问题已自动修正:\n{config_schema.format_issues(issues)}")
+    
+    def build_config(self):
+        """生成当前配置字典"""
         # 确保当前的 key_sounds 保存到当前场景
         self.scenes[self.current_scene]['key_sounds'] = self.key_sounds
         
-        config = {
+        return {
+            'schema_version': config_schema.SCHEMA_VERSION,
             'current_scene': self.current_scene,
             'scenes': self.scenes,
             'stop_key': self.stop_key,
             'stop_on_unbound': self.stop_on_unbound,
-            'long_press_optimize': self.long_press_optimize
+            'long_press_optimize': self.long_press_optimize,
+            'event_queue_size': self.event_queue_size,
+            'sample_cache_budget_mb': self.sample_cache_budget_mb,
+            'voice_count': self.voice_count,
+            'max_voices_per_key': self.max_voices_per_key,
+            'voice_steal_policy': self.voice_steal_policy,
+            'latency_tracking': self.latency.enabled,
+            'scene_hotkey_modifiers': self.scene_hotkey_modifiers,
+            'normalize_loudness': self.normalize_loudness,
+            'target_loudness': self.target_loudness,
+            'pcm_cache_size_mb': self.pcm_cache_size_mb,
+            'stream_threshold_mb': self.stream_threshold_mb,
+            'retrigger_interval_ms': self.retrigger_interval_ms
         }
-        ConfigManager.save_config(config)
+    
+    def save_config(self):
+        """保存配置，短时间内的多次修改会合并为一次后台写入"""
+        self._scene_dirty = False
+        self.config_saver.schedule(self.build_config())
+    
+    def binding_names(self):
+        """所有场景中用到的按键名称，以及停止键和场景快捷键"""
+        names = set(SCENE_HOTKEY_DIGITS)
+        names.add(self.stop_key)
+        for scene in self.scenes.values():
+            names.update(scene['key_sounds'])
+        return names
+    
+    def refresh_key_table(self):
+        """按键绑定变化后重建扫描码表，未在监听时等到开始监听再构建"""
+        self.key_filter.reset()
+        if self.is_running:
+            self.key_table.build(self.binding_names())
+    
+    def set_stop_key(self, key):
+        """设置停止键"""
+        self.stop_key = key
+        self.refresh_key_table()
+        self.save_config()
+    
+    def shutdown(self):
+        """退出前停止监听并写入尚未保存的配置"""
+        if self.is_running:
+            self.toggle_running()
+        if self._scene_dirty:
+            self.save_config()
+        self.config_saver.flush()
+        self.sequencer.shutdown()
+        self.sound_loader.shutdown()
+        pcm_cache.save_index()
     
     def add_sound(self, key, sound_path):
         """添加新的按键音频绑定"""
         try:
             self.key_sounds[key] = sound_path
-            self.sounds[key] = pygame.mixer.Sound(sound_path)
+            self.create_sound(key, sound_path)
+            self.refresh_key_table()
             self.save_config()
         except Exception as e:
-            messagebox.showerror("错误", f"添加音频失败: {str(e)}")
+            self.show_message('error', "错误", f"添加音频失败: {str(e)}")
+    
+    def import_folder(self, folder):
+        """批量导入文件夹中的音频到当前场景
+
+        在后台线程中按映射文件或文件名约定规划绑定，并行解码校验所有音频，全部完成后发布 BindingsDecoded 事件。
+        场景、按键绑定和配置由界面线程读写，订阅者需要在界面线程中调用 finish_import 一次性提交：
+        只写一次配置，只发布一次 BindingsImported 事件。
+        """
+        thread = threading.Thread(target=self._import_folder, args=(self.current_scene, folder),
+                                  name='BulkImport', daemon=True)
+        thread.start()
+        return thread
+    
+    def _import_folder(self, scene_id, folder):
+        try:
+            bindings, issues = plan_folder(folder, self.stop_key)
+            streamed, decoded = self.split_streamed(scene_id, bindings)
+            sounds, decode_issues = decode_all(decoded)
+        except Exception as e:
+            self.show_message('error', "错误", f"批量导入失败: {str(e)}")
+            return
+        sounds.update(streamed)
+        self.events.publish(BindingsDecoded(scene_id, {key: bindings[key] for key in sounds}, sounds,
+                                            issues + decode_issues))
+    
+    def finish_import(self, decoded):
+        """在界面线程中提交 BindingsDecoded 事件中已解码的绑定"""
+        keys = self.commit_bindings(decoded.scene_id, decoded.key_sounds, decoded.sounds)
+        self.events.publish(BindingsImported(decoded.scene_id, keys, decoded.issues))
+    
+    def commit_bindings(self, scene_id, key_sounds, sounds):
+        """一次性提交一组已解码的按键绑定，已有的同名绑定被替换，返回提交的按键列表（在界面线程中调用）"""
+        scene = self.scenes.get(scene_id)
+        if scene is None or not key_sounds:
+            return []
+        # 当前场景的 key_sounds 与 self.key_sounds 是同一个字典
+        scene['key_sounds'].update(key_sounds)
+        if scene_id == self.current_scene:
+            target = self.sounds
+        else:
+            target = self.resident_sounds.get(scene_id)
+        if target is not None:
+            for key, sound in sounds.items():
+                self.prepare_sound(target, scene_id, key, sound)
+        self.refresh_key_table()
+        self.save_config()
+        return list(key_sounds)
     
     def play_sound(self, key):
-        """播放指定按键的声音"""
-        print(f"[DEBUG] 尝试播放按键 {key} 的声音")
-        if key in self.sounds:
-            # 如果有声音在播放，先停止并清除按键状态
-            if self.current_playing:
-                print(f"[DEBUG] 停止当前播放的声音")
-                self.current_playing.stop()
-                self.pressed_keys.clear()
-                print(f"[DEBUG] 清除按键状态，当前状态: {self.pressed_keys}")
-            
-            # 播放新的声音
-            print(f"[DEBUG] 开始播放按键 {key} 的声音")
-            self.sounds[key].play()
-            self.current_playing = self.sounds[key]
-            self.pressed_keys.add(key)
-            print(f"[DEBUG] 添加新按键，当前状态: {self.pressed_keys}")
-            
-            # 检查音频播放完成
-            def check_sound_finished():
-                if self.current_playing and not pygame.mixer.get_busy():
-                    print(f"[DEBUG] 音频播放完成，清除状态")
-                    self.current_playing = None
-                    self.pressed_keys.clear()
-                    print(f"[DEBUG] 清除后的按键状态: {self.pressed_keys}")
-                    # 清除状态显示
-                    if self.status_label:
-                        self.status_label.config(text="正在运行" if self.is_running else "已停止")
-                elif self.current_playing:
-                    self.gui.root.after(100, check_sound_finished)
-            
-            self.gui.root.after(100, check_sound_finished)
+        """播放指定按键的声音，与正在播放的其他声音重叠"""
+        logger.debug("播放按键 %s 的声音", key)
+        sound = self.sounds.get(key)
+        if sound is not None:
+            cls = sound.__class__
+            if cls is StreamedSound:
+                sound.play()
+            elif cls is VariantSet:
+                self.voice_manager.play(key, sound.next(), sound.gain)
+            else:
+                self.voice_manager.play(key, sound)
+            steps = self.sequences.get(key)
+            if steps is not None:
+                self.sequencer.start(key, steps)
+            if self.latency.enabled:
+                self.latency.record(key, self._hook_time, self._dispatch_time, time.perf_counter())
     
     def stop_sound(self):
-        """停止当前播放的声音"""
-        if self.current_playing:
-            self.current_playing.stop()
-            self.current_playing = None
+        """停止所有正在播放的声音"""
+        self.sequencer.cancel_all()
+        self.voice_manager.stop_all()
+        StreamedSound.stop()
         self.pressed_keys.clear()
     
+    def set_scene_hotkey_modifiers(self, modifiers):
+        """设置场景快捷键的修饰键组合"""
+        self.scene_hotkey_modifiers = modifiers or ''
+        self._hotkey_modifiers = parse_modifiers(self.scene_hotkey_modifiers)
+    
+    def set_loudness_normalization(self, enabled, target_loudness=None):
+        """设置导入音频时是否统一响度，设置变化后已解码的音频需要重新处理"""
+        self.normalize_loudness = bool(enabled)
+        if target_loudness is not None:
+            self.target_loudness = float(target_loudness)
+        if pcm_cache.configure(normalize=self.normalize_loudness, target_loudness=self.target_loudness):
+            sample_cache.clear()
+            self.resident_sounds = {}
+            self.step_sounds.clear()
+            self._warm_scenes.clear()
+    
+    def set_retrigger_interval(self, interval_ms):
+        """设置同一按键两次触发的最小间隔（毫秒）"""
+        self.retrigger_interval_ms = max(0, interval_ms)
+        self.key_filter.retrigger_interval = self.retrigger_interval_ms / 1000
+    
+    def set_latency_tracking(self, enabled):
+        """开启或关闭延迟统计"""
+        self.latency.enabled = enabled
+        self.save_config()
+    
+    def get_voice_stats(self):
+        """获取声部统计信息"""
+        return self.voice_manager.get_stats()
+    
     def remove_sound(self, key):
         """移除按键音频绑定"""
         if key in self.key_sounds:
             del self.key_sounds[key]
-            del self.sounds[key]
+            self.sounds.pop(key, None)
+            self.scenes[self.current_scene].get('key_options', {}).pop(key, None)
+            if self.sequences.pop(key, None) is not None:
+                self.sequencer.cancel(key)
             self.save_config()
     
-    def set_gui_elements(self, status_label, start_button, gui):
-        """设置GUI元素引用"""
-        self.status_label = status_label
-        self.start_button = start_button
-        self.gui = gui
-    
-    def toggle_running(self):
-        """切换运行状态"""
+    def toggle_running(self, hook=True):
+        """切换运行状态
+
+        hook 为 False 时只启动分发线程，不安装键盘钩子，按键事件由调用方
+        通过 on_keyboard_press / on_keyboard_release 注入（用于回放和基准测试）。
+        """
         self.is_running = not self.is_running
+        # 暂停期间按住或松开的按键状态已不可靠，开始和停止监听时都清空
+        self.key_filter.reset()
         
         if self.is_running:
-            self.keyboard_listener = keyboard.on_press(self.on_keyboard_press)
-            self.keyboard_release_listener = keyboard.on_release(self.on_keyboard_release)
-            if self.status_label:
-                self.status_label.config(text="正在运行")
-            if self.start_button:
-                self.start_button.config(text="停止监听", bg='#f44336')
+            self.key_table.build(self.binding_names())
+            self.dispatcher.start()
+            if hook:
+                self.keyboard_listener = keyboard.on_press(self.on_keyboard_press)
+                self.keyboard_release_listener = keyboard.on_release(self.on_keyboard_release)
         else:
             if self.keyboard_listener:
                 keyboard.unhook(self.keyboard_listener)
+                self.keyboard_listener = None
             if self.keyboard_release_listener:
                 keyboard.unhook(self.keyboard_release_listener)
+                self.keyboard_release_listener = None
+            self.dispatcher.stop()
             self.pressed_keys.clear()
+            self.held_modifiers.clear()
             self.stop_sound()
-            if self.status_label:
-                self.status_label.config(text="已停止")
-            if self.start_button:
-                self.start_button.config(text="启动监听", bg='#4CAF50')
+        self.events.publish(RunningChanged(self.is_running))
     
     def on_keyboard_press(self, event):
+        """键盘钩子回调：过滤重复按键后记录时间戳并入队，不做任何耗时操作"""
+        if self.is_running:
+            now = time.perf_counter()
+            # 开启长按优化时，按住按键产生的自动重复事件在这里直接丢弃
+            if self.key_filter.accept_press(event, now, self.long_press_optimize):
+                self.event_queue.put((now, True, event))
+    
+    def on_keyboard_release(self, event):
+        """键盘钩子回调：记录按键松开并入队"""
+        if self.is_running:
+            self.key_filter.release(event)
+            # 松开事件可以使用队列的保留区，避免按键停留在按下状态
+            self.event_queue.put((time.perf_counter(), False, event), True)
+    
+    def on_release_lost(self):
+        """队列溢出丢失了松开事件，无法知道哪些按键已松开，清空分发线程中的按键状态"""
+        logger.warning("按键事件队列溢出，丢失了按键松开事件")
+        self.pressed_keys.clear()
+        self.held_modifiers.clear()
+    
+    def dispatch_key_event(self, timestamp, is_press, event):
+        """在分发线程中处理队列里的按键事件"""
+        if self.latency.enabled:
+            self._hook_time = timestamp
+            self._dispatch_time = time.perf_counter()
+        if is_press:
+            self.handle_key_press(event)
+        else:
+            self.handle_key_release(event)
+    
+    def get_cache_stats(self):
+        """获取解码音频缓存的统计信息"""
+        return sample_cache.get_stats()
+    
+    def get_input_stats(self):
+        """获取钩子层按键过滤的统计信息"""
+        return self.key_filter.get_stats()
+    
+    def get_key_table_stats(self):
+        """获取扫描码转换表的统计信息"""
+        return self.key_table.get_stats()
+    
+    def get_queue_stats(self):
+        """获取按键事件队列的统计信息"""
+        stats = self.event_queue.get_stats()
+        stats['dispatched'] = self.dispatcher.dispatched
+        stats['batches'] = self.dispatcher.batches
+        return stats
+    
+    def handle_key_press(self, event):
         """处理按键按下事件"""
         if not self.is_running:
             return
             
-        key = event.name.upper()
+        key = self.key_table.resolve(event)
         
         # 如果有对话框打开，不处理按键事件
-        if self.gui and self.gui.root.focus_get() and isinstance(self.gui.root.focus_get(), Toplevel):
+        if self.input_suspended:
+            return
+        
+        # 场景快捷键：按住修饰键再按数字键，在分发线程中直接切换场景
+        modifier = MODIFIER_NAMES.get(key)
+        if modifier is not None:
+            self.held_modifiers.add(modifier)
+            # 未绑定音频的快捷键修饰键不触发"未绑定按键停止播放"
+            if modifier in self._hotkey_modifiers and key not in self.key_sounds:
+                return
+        elif (self._hotkey_modifiers and key in SCENE_HOTKEY_DIGITS
+                and self._hotkey_modifiers <= self.held_modifiers):
+            self.switch_scene_by_index(SCENE_HOTKEY_DIGITS[key])
             return
         
         # 如果是停止键
         if key == self.stop_key:
             self.stop_sound()
-            if self.status_label:
-                self.status_label.config(text="停止播放")
-                self.gui.root.after(2000, lambda: self.status_label.config(
-                    text="正在运行" if self.is_running else "已停止"
-                ))
+            self.events.publish(SoundStopped())
             return
         
         # 如果开启了长按优化，检查按键状态
@@ -190,42 +687,61 @@ class SoundPlayer:
         
         self.play_sound_with_feedback(key)
     
-    def on_keyboard_release(self, event):
+    def handle_key_release(self, event):
         """处理按键释放事件"""
-        key = event.name.upper()
+        key = self.key_table.resolve(event)
         self.pressed_keys.discard(key)
+        modifier = MODIFIER_NAMES.get(key)
+        if modifier is not None:
+            self.held_modifiers.discard(modifier)
     
     def play_sound_with_feedback(self, key):
-        """播放声音并更新界面反馈"""
+        """播放声音并发布反馈事件"""
         if key in self.key_sounds:
-            if self.status_label:
-                self.status_label.config(text=f"播放按键 {key} 的音频")
             self.play_sound(key)
+            self.events.publish(SoundPlayed(key))
         else:
             if self.stop_on_unbound:
                 self.stop_sound()
-            if self.status_label:
-                self.status_label.config(text=f"按键 {key} 未绑定音频")
-        
-        # 2秒后恢复状态显示
-        if self.status_label and self.gui:
-            self.gui.root.after(2000, lambda: self.status_label.config(
-                text="正在运行" if self.is_running else "已停止"
-            )) 
-    
-    def switch_scene(self, scene_id):
-        """切换场景"""
+            self.events.publish(KeyUnbound(key))
+    
+    def switch_scene_by_index(self, index):
+        """按标签顺序切换场景，供场景快捷键使用，不立即写入配置"""
+        for i, scene_id in enumerate(self.scenes):
+            if i == index:
+                if scene_id != self.current_scene:
+                    self.switch_scene(scene_id, persist=False)
+                return True
+        return False
+    
+    def switch_scene(self, scene_id, persist=True):
+        """切换场景
+
+        persist 为 False 时只标记配置待保存，在下次保存配置或退出时写入。
+        """
         if scene_id in self.scenes:
             # 保存当前场景的按键绑定
             self.scenes[self.current_scene]['key_sounds'] = self.key_sounds
             # 切换到新场景
             self.current_scene = scene_id
             self.key_sounds = self.scenes[scene_id]['key_sounds']
-            # 重新加载音频
-            self.sounds.clear()
-            self.load_sounds()
+            resident = self.resident_sounds.get(scene_id)
+            if resident is not None:
+                # 常驻场景直接替换引用，不需要重新加载；补齐未加载的音频和预取相邻场景都在加载线程中进行
+                self.sound_loader.cancel()
+                self.sounds = resident
+                self.load_sequences()
+                self.events.publish(LoadProgress(len(resident), len(self.key_sounds), True))
+                self.prefetch_scenes()
+            else:
+                # 重新加载音频
+                self.load_sounds()
             # 保存配置
-            self.save_config()
+            if persist:
+                self.save_config()
+            else:
+                self._scene_dirty = True
+            self.events.publish(SceneSwitched(scene_id))
             return True
         return False
     
@@ -247,7 +763,7 @@ class SoundPlayer:
         if scene_id in self.scenes:
             # 如果只剩一个场景，不允许删除
             if len(self.scenes) == 1:
-                messagebox.showwarning("警告", "至少需要保留一个场景")
+                self.show_message('warning', "警告", "至少需要保留一个场景")
                 return False
             
             # 如果要删除的是当前场景，先保存当前场景的按键绑定
@@ -256,6 +772,8 @@ class SoundPlayer:
             
             # 删除场景
             del self.scenes[scene_id]
+            self.resident_sounds.pop(scene_id, None)
+            self.scene_sequences.pop(scene_id, None)
             
             # 如果删除的是当前场景，切换到其他场景
             if self.current_scene == scene_id:
@@ -264,10 +782,10 @@ class SoundPlayer:
                 self.current_scene = new_scene_id
                 self.key_sounds = self.scenes[new_scene_id]['key_sounds']
                 # 重新加载音频
-                self.sounds.clear()
                 self.load_sounds()
             
             self.save_config()
+            self.events.publish(SceneSwitched(self.current_scene))
             return True
         return False
     
@@ -280,7 +798,7 @@ class SoundPlayer:
                     json.dump(scene_data, f, indent=4, ensure_ascii=False)
                 return True
             except Exception as e:
-                messagebox.showerror("错误", f"导出场景失败: {str(e)}")
+                self.show_message('error', "错误", f"导出场景失败: {str(e)}")
         return False
     
     def import_scene(self, filepath):
@@ -289,68 +807,98 @@ class SoundPlayer:
             with open(filepath, 'r', encoding='utf-8') as f:
                 scene_data = json.load(f)
                 if isinstance(scene_data, dict) and 'name' in scene_data and 'key_sounds' in scene_data:
-                    # 生成唯一的场景ID
-                    scene_id = f"scene_{len(self.scenes)}"
-                    while scene_id in self.scenes:
-                        scene_id = f"scene_{int(scene_id.split('_')[1]) + 1}"
+                    scene_id = self.new_scene_id()
                     
                     self.scenes[scene_id] = scene_data
                     self.save_config()
                     return scene_id
                 else:
-                    messagebox.showerror("错误", "无效的场景文件格式")
+                    self.show_message('error', "错误", "无效的场景文件格式")
         except Exception as e:
-            messagebox.showerror("错误", f"导入场景失败: {str(e)}")
+            self.show_message('error', "错误", f"导入场景失败: {str(e)}")
         return None 
     
+    def new_scene_id(self):
+        """生成未被使用的场景ID"""
+        scene_id = f"scene_{len(self.scenes)}"
+        while scene_id in self.scenes:
+            scene_id = f"scene_{int(scene_id.split('_')[1]) + 1}"
+        return scene_id
+    
+    def export_scene_pack(self, scene_id, filepath, predecoded=False):
+        """把场景及其音频导出为音效包
+
+        predecoded 为 True 时写入按当前混音器格式预解码的 PCM 数据，加载时不需要解码，
+        否则写入原始音频文件，体积更小。
+        """
+        if scene_id not in self.scenes:
+            return False
+        try:
+            errors = export_pack(self.scenes[scene_id], filepath,
+                                 decode=sample_cache.get if predecoded else None)
+        except Exception as e:
+            self.show_message('error', "错误", f"导出音效包失败: {str(e)}")
+            return False
+        if errors:
+            details = "\n".join(f"{path}: {error}" for path, error in errors)
+            self.show_message('warning', "警告", f"以下音频未能写入音效包:\n{details}")
+        return True
+    
+    def import_scene_pack(self, filepath):
+        """导入音效包：复制到音效包目录并新建一个场景，返回新场景的ID"""
+        try:
+            pack_path, scene = install_pack(filepath)
+            scene_id = self.new_scene_id()
+            issues = config_schema.validator.validate_scene(scene_id, scene)
+        except Exception as e:
+            self.show_message('error', "错误", f"导入音效包失败: {str(e)}")
+            return None
+        logger.info("已导入音效包 %s，绑定按键 %d 个", pack_path, len(scene['key_sounds']))
+        self.scenes[scene_id] = scene
+        self.switch_scene(scene_id)
+        self.report_config_issues(issues)
+        return scene_id
+    
     def export_config(self, filepath):
         """导出所有配置"""
         try:
             # 确保当前场景的按键绑定已保存
             self.scenes[self.current_scene]['key_sounds'] = self.key_sounds
             
-            config = {
-                'current_scene': self.current_scene,
-                'scenes': self.scenes,
-                'stop_key': self.stop_key,
-                'stop_on_unbound': self.stop_on_unbound,
-                'long_press_optimize': self.long_press_optimize
-            }
+            config = self.build_config()
             
             with open(filepath, 'w', encoding='utf-8') as f:
                 json.dump(config, f, indent=4, ensure_ascii=False)
             return True
         except Exception as e:
-            messagebox.showerror("错误", f"导出配置失败: {str(e)}")
+            self.show_message('error', "错误", f"导出配置失败: {str(e)}")
             return False
     
     def import_config(self, filepath):
-        """导入所有配置"""
+        """导入所有配置，与启动时加载配置使用同一套迁移和校验"""
         try:
-            with open(filepath, 'r', encoding='utf-8') as f:
-                config = json.load(f)
-                
-                # 验证配置文件格式
-                required_keys = ['current_scene', 'scenes', 'stop_key', 'stop_on_unbound', 'long_press_optimize']
-                if not all(key in config for key in required_keys):
-                    messagebox.showerror("错误", "无效的配置文件格式")
-                    return False
-                
-                # 更新所有配置
-                self.scenes = config['scenes']
-                self.current_scene = config['current_scene']
-                self.key_sounds = self.scenes[self.current_scene]['key_sounds']
-                self.stop_key = config['stop_key']
-                self.stop_on_unbound = config['stop_on_unbound']
-                self.long_press_optimize = config['long_press_optimize']
-                
-                # 重新加载音频
-                self.sounds.clear()
-                self.load_sounds()
-                
-                # 保存配置
-                self.save_config()
-                return True
+            config, issues = ConfigManager.read_config(filepath)
+        except Exception as e:
+            self.show_message('error', "错误", f"导入配置失败: {str(e)}")
+            return False
+        
+        try:
+            # 更新所有配置，事件队列深度和声部数在下次启动时生效
+            self.apply_config(config)
+            self.resident_sounds = {}
+            self.scene_sequences = {}
+            self.voice_manager.max_voices_per_key = self.max_voices_per_key
+            self.voice_manager.steal_policy = self.voice_steal_policy
+            
+            # 重新加载音频
+            self.load_sounds()
+            self.refresh_key_table()
+            
+            # 保存配置
+            self.save_config()
+            self.events.publish(SceneSwitched(self.current_scene))
+            self.report_config_issues(issues)
+            return True
         except Exception as e:
-            messagebox.showerror("错误", f"导入配置失败: {str(e)}")
-            return False 
\ No newline at end of file
+            self.show_message('error', "错误", f"导入配置失败: {str(e)}")
+            return False
@@ -0,0 +1,55 @@
+import os
+import pygame
+from .scene_pack import is_pack_ref
+
+DEFAULT_STREAM_THRESHOLD_MB = 8
+
+
+class StreamedSound:
+    """通过 pygame.mixer.music 流式播放的长音频
+
+    播放时边解码边输出，不需要把整个文件解码进内存。
+    pygame 只有一个音乐通道，同一时间只能播放一个流式音频，
+    新的流式音频会打断正在播放的那个，不影响 Sound 通道上的短音效。
+    """
+
+    __slots__ = ('path',)
+
+    loaded_path = None  # 音乐通道当前加载的文件，重复播放同一文件时不必重新打开
+
+    def __init__(self, path):
+        self.path = path
+
+    def play(self):
+        """从头开始播放"""
+        if StreamedSound.loaded_path != self.path:
+            pygame.mixer.music.load(self.path)
+            StreamedSound.loaded_path = self.path
+        pygame.mixer.music.play()
+
+    @staticmethod
+    def stop():
+        """停止正在播放的流式音频"""
+        if pygame.mixer.get_init():
+            pygame.mixer.music.stop()
+
+    @staticmethod
+    def is_playing():
+        return bool(pygame.mixer.get_init()) and pygame.mixer.music.get_busy()
+
+
+def should_stream(sound_path, options, threshold_mb):
+    """判断按键绑定是否使用流式播放
+
+    绑定选项中明确设置了 stream 时以设置为准，否则按文件大小自动选择。
+    音效包中的条目总是解码后播放。
+    """
+    if is_pack_ref(sound_path):
+        return False
+    stream = options.get('stream') if options else None
+    if stream is not None:
+        return bool(stream)
+    try:
+        return os.path.getsize(sound_path) >= threshold_mb * 1024 * 1024
+    except OSError:
+        return False
@@ -0,0 +1,84 @@
+import pygame
+from . import normalizer
+
+DEFAULT_VARIANTS = 4        # 设置了音高变化但没有指定变体数量时预先生成的变体数
+PLAYBACK_OPTIONS = ('gain_db', 'fade_in_ms', 'fade_out_ms', 'pitch_variation', 'variants')
+
+
+class VariantSet:
+    """按键的一组预先生成的 Sound 变体，每次播放轮流取下一个"""
+    __slots__ = ('sounds', 'index', 'gain')
+
+    def __init__(self, sounds, gain=1.0):
+        self.sounds = sounds
+        self.index = 0
+        self.gain = gain        # 已作用在所有变体上的线性增益，供声部抢占策略比较
+
+    def next(self):
+        """取出下一个变体"""
+        sound = self.sounds[self.index]
+        self.index = (self.index + 1) % len(self.sounds)
+        return sound
+
+
+def has_playback_options(options):
+    """按键选项中是否设置了需要预处理的播放参数"""
+    return bool(options) and any(options.get(name) for name in PLAYBACK_OPTIONS)
+
+
+def pitch_factors(variation, count):
+    """在 [-variation, +variation] 半音范围内均匀分布的变速倍数"""
+    if not variation or count <= 1:
+        return [1.0]
+    step = 2.0 * variation / (count - 1)
+    return [2.0 ** ((-variation + i * step) / 12.0) for i in range(count)]
+
+
+def render(samples, rate, gain_db=0.0, fade_in_ms=0.0, fade_out_ms=0.0, factor=1.0):
+    """对 (帧数, 声道数) 的浮点数组做变速、增益和淡入淡出，返回新数组"""
+    # 只有设置了播放参数的按键才会走到这里，没有用到时不加载 numpy
+    import numpy as np
+    if factor != 1.0 and len(samples) > 1:
+        # 线性插值重采样：factor > 1 时音调升高、时长缩短
+        length = max(1, int(len(samples) / factor))
+        positions = np.arange(length) * factor
+        source = np.arange(len(samples))
+        samples = np.stack([np.interp(positions, source, samples[:, c]) for c in range(samples.shape[1])], axis=1)
+    else:
+        samples = samples.copy()
+
+    if gain_db:
+        samples *= 10.0 ** (gain_db / 20.0)
+    frames = len(samples)
+    fade_in = min(frames, int(rate * fade_in_ms / 1000))
+    if fade_in > 0:
+        samples[:fade_in] *= np.linspace(0.0, 1.0, fade_in, endpoint=False)[:, None]
+    fade_out = min(frames, int(rate * fade_out_ms / 1000))
+    if fade_out > 0:
+        samples[frames - fade_out:] *= np.linspace(1.0, 0.0, fade_out)[:, None]
+    return samples
+
+
+def build(sound, options, mixer_format):
+    """根据按键的播放参数预先生成 Sound 或 VariantSet
+
+    没有设置播放参数或采样格式不支持时原样返回 sound。
+    所有处理在加载时完成，播放时只需要选择一个变体交给声部播放。
+    """
+    if not has_playback_options(options) or not mixer_format:
+        return sound
+    rate, size, channels = mixer_format
+    if size not in normalizer.SAMPLE_DTYPES:
+        return sound
+    samples = normalizer.to_float(sound.get_raw(), size, channels)
+    gain_db = options.get('gain_db', 0.0)
+    count = options.get('variants') or (DEFAULT_VARIANTS if options.get('pitch_variation') else 1)
+    sounds = []
+    for factor in pitch_factors(options.get('pitch_variation', 0.0), count):
+        rendered = render(samples, rate, gain_db, options.get('fade_in_ms', 0.0),
+                          options.get('fade_out_ms', 0.0), factor)
+        sounds.append(pygame.mixer.Sound(buffer=normalizer.from_float(rendered, size)))
+    # 调整了增益的单个 Sound 也放入 VariantSet，播放时才能知道实际的增益
+    if len(sounds) == 1 and not gain_db:
+        return sounds[0]
+    return VariantSet(sounds, 10.0 ** (gain_db / 20.0))
@@ -0,0 +1,128 @@
+import threading
+import time
+import pygame
+
+
+class Voice:
+    """一个固定的混音通道及其当前播放状态"""
+    __slots__ = ('channel', 'key', 'started', 'ends', 'gain')
+
+    def __init__(self, channel):
+        self.channel = channel
+        self.key = None         # 正在播放的按键，None 表示空闲
+        self.started = 0.0      # 开始播放的时间
+        self.ends = 0.0         # 预计结束的时间
+        self.gain = 1.0         # 播放时实际使用的线性增益
+
+    def release(self):
+        self.key = None
+
+
+class VoiceManager:
+    """多声部播放管理
+
+    预先分配固定数量的 pygame Channel，按键播放时分配空闲通道，实现多个音效重叠播放。
+    每个通道记录开始时间和预计结束时间，分配时据此回收已播放完的通道，
+    不需要定时轮询 mixer 状态。
+
+    声部抢占策略（通道全部占用时）：
+    - oldest: 抢占最早开始播放的声部
+    - quietest: 抢占增益最低的声部（按键设置的增益已预先作用在音频上，由调用方传入），增益相同时抢占最快结束的
+    - same_key: 优先抢占同一按键的声部，没有时退回 oldest
+    """
+
+    STEAL_POLICIES = ('oldest', 'quietest', 'same_key')
+
+    def __init__(self, num_voices=16, max_voices_per_key=2, steal_policy='oldest'):
+        self.max_voices_per_key = max(1, int(max_voices_per_key))
+        self.steal_policy = steal_policy if steal_policy in self.STEAL_POLICIES else 'oldest'
+        self.voices = []
+        self.played = 0         # 播放次数
+        self.stolen = 0         # 抢占次数
+        # 分发线程和序列调度线程都会分配声部
+        self._lock = threading.Lock()
+        if pygame.mixer.get_init():
+            num_voices = max(1, int(num_voices))
+            pygame.mixer.set_num_channels(num_voices)
+            self.voices = [Voice(pygame.mixer.Channel(i)) for i in range(num_voices)]
+
+    def play(self, key, sound, gain=1.0):
+        """为按键分配一个声部并播放，返回使用的 Channel，gain 为 sound 已作用的线性增益"""
+        if not self.voices:
+            return None
+        with self._lock:
+            return self._play(key, sound, gain)
+
+    def _play(self, key, sound, gain):
+        """分配声部并播放（需持有锁）"""
+        now = time.monotonic()
+        free = None
+        same_key = []
+        for voice in self.voices:
+            if voice.key is None:
+                if free is None:
+                    free = voice
+            elif now >= voice.ends:
+                voice.key = None
+                if free is None:
+                    free = voice
+            elif voice.key == key:
+                same_key.append(voice)
+
+        if len(same_key) >= self.max_voices_per_key:
+            # 超出单个按键的复音数限制，替换该按键最早的声部
+            voice = min(same_key, key=lambda v: v.started)
+            self.stolen += 1
+        elif free is not None:
+            voice = free
+        else:
+            voice = self._select_victim(same_key)
+            self.stolen += 1
+
+        voice.channel.play(sound)
+        voice.key = key
+        voice.started = now
+        voice.ends = now + sound.get_length()
+        voice.gain = gain
+        self.played += 1
+        return voice.channel
+
+    def _select_victim(self, same_key):
+        """按抢占策略选择要被替换的声部"""
+        if self.steal_policy == 'same_key' and same_key:
+            return min(same_key, key=lambda v: v.started)
+        if self.steal_policy == 'quietest':
+            return min(self.voices, key=lambda v: (v.gain, v.ends))
+        return min(self.voices, key=lambda v: v.started)
+
+    def stop_key(self, key):
+        """停止某个按键的所有声部"""
+        with self._lock:
+            for voice in self.voices:
+                if voice.key == key:
+                    voice.channel.stop()
+                    voice.release()
+
+    def stop_all(self):
+        """停止所有声部"""
+        with self._lock:
+            for voice in self.voices:
+                if voice.key is not None:
+                    voice.channel.stop()
+                    voice.release()
+
+    def active_count(self):
+        """当前正在播放的声部数量"""
+        now = time.monotonic()
+        return sum(1 for voice in self.voices if voice.key is not None and now < voice.ends)
+
+    def get_stats(self):
+        """获取声部统计信息"""
+        return {
+            'voices': len(self.voices),
+            'active': self.active_count(),
+            'played': self.played,
+            'stolen': self.stolen,
+            'steal_policy': self.steal_policy,
+            'max_voices_per_key': self.max_voices_per_key,
+        }
@@ -1,11 +1,27 @@
 from tkinter import *
-from tkinter import ttk, messagebox
+from tkinter import messagebox
 import os
+import time
+
+# 按键各状态的显示颜色 (背景色, 文字颜色)
+KEY_COLORS = {
+    'stop': ('#FF5252', '#FFFFFF'),       # 停止键
+    'bound': ('#2196F3', '#FFFFFF'),      # 已绑定音频
+    'unbound': ('#F5F5F5', '#333333'),    # 未绑定
+}
+KEY_PRESSED_COLORS = {
+    'bound': '#1976D2',
+    'unbound': '#E0E0E0',
+}
+KEY_OUTLINE = '#D6D6D6'
+FLASH_COLOR = '#0D47A1'     # 播放时按键闪烁的颜色
+FLASH_DURATION = 150        # 闪烁持续时间（毫秒）
 
 class KeyboardUI(Frame):
-    def __init__(self, parent, player, **kwargs):
+    def __init__(self, parent, player, scheduler, **kwargs):
         super().__init__(parent, **kwargs)
         self.player = player
+        self.scheduler = scheduler  # 闪烁结束的定时任务由界面调度器在帧内执行
         self.configure(bg='#FFFFFF')
         
         # 设置固定尺寸
@@ -13,17 +29,22 @@ class KeyboardUI(Frame):
         self.grid_propagate(False)  # 防止网格布局影响容器大小
         
         # 计算键盘合适的固定尺寸
-        base_width = 64  # 基础按键宽度
-        base_height = 64  # 基础按键高度
-        gap = 6  # 间隙
+        self.base_width = 64  # 基础按键宽度
+        self.base_height = 64  # 基础按键高度
+        self.gap = 6  # 间隙
         
         # 计算总宽度（基于最长的一行）
-        total_width = (base_width * 15) + (gap * 14) + 20  # 15个单位宽度 + 间隙 + padding
+        self.canvas_width = (self.base_width * 15) + (self.gap * 14) + 20  # 15个单位宽度 + 间隙 + padding
         # 计算总高度（5行按键）
-        total_height = (base_height * 5) + (gap * 4) + 20  # 5行按键 + 间隙 + padding
+        self.canvas_height = (self.base_height * 5) + (self.gap * 4) + 20  # 5行按键 + 间隙 + padding
         
-        # 设置固定尺寸
-        self.configure(width=total_width, height=total_height)
+        # 设置固定尺寸（额外一行用于显示加载进度）
+        self.configure(width=self.canvas_width, height=self.canvas_height + 24)
+        
+        # 按键名称 -> [(矩形ID, 文字ID), ...]，同名按键（如左右 SHIFT）对应多组图形
+        self.key_items = {}
+        self.key_states = {}        # 按键名称 -> 当前显示状态
+        self.flashing = {}          # 正在闪烁的按键 -> 结束时间（毫秒）
         
         # 键盘布局定义 - 使用统一的单位宽度
         self.keyboard_layout = [
@@ -59,120 +80,136 @@ class KeyboardUI(Frame):
             ]
         ]
         
+        self.create_progress_label()
         self.create_keyboard()
-        
-    def create_keyboard(self):
-        """创建键盘界面"""
-        # 键盘容器
-        keyboard_frame = Frame(self, bg='#FFFFFF', padx=10, pady=10)
-        keyboard_frame.pack(expand=True)
-        
-        # 基础按键大小
-        base_width = 64  # 增大基础宽度
-        base_height = 64  # 增大基础高度
-        gap = 6  # 调整间隙
-        
-        # 创建每一行按键
-        for row_index, row in enumerate(self.keyboard_layout):
-            row_frame = Frame(keyboard_frame, bg='#FFFFFF')
-            row_frame.pack(pady=gap/2)
-            
-            # 计算当前行的总单位数
-            total_units = sum(width for _, width in row)
-            
-            # 创建每个按键
-            for key, width_multiplier in row:
-                # 计算按键宽度，确保每行总宽度相同
-                key_width = int(base_width * width_multiplier)
-                key_button = self.create_key_button(
-                    row_frame, 
-                    key, 
-                    key_width, 
-                    base_height
-                )
-                key_button.pack(side='left', padx=gap/2)
     
-    def create_key_button(self, parent, key, width, height):
-        """创建单个按键"""
-        # 按键框架
-        button_frame = Frame(
-            parent,
-            width=width,
-            height=height,
-            bg='#FFFFFF'
+    def create_progress_label(self):
+        """创建音频加载进度提示"""
+        self.progress_label = Label(
+            self,
+            text="",
+            font=('Microsoft YaHei UI', 9),
+            bg='#FFFFFF',
+            fg='#666666',
+            anchor='e'
         )
-        button_frame.pack_propagate(False)
-        
-        # 判断按键是否已绑定音频或是停止键
-        is_bound = key in self.player.key_sounds
-        is_stop_key = key.upper() == self.player.stop_key.upper()
-        
-        # 设置按键颜色和显示文本
-        display_text = key
-        if is_stop_key:
-            bg_color = '#FF5252'
-            fg_color = '#FFFFFF'
-            display_text = f"{key}\n[停止键]"
-        elif is_bound:
-            bg_color = '#2196F3'
-            fg_color = '#FFFFFF'
+        self.progress_label.pack(fill='x', padx=16)
+    
+    def set_load_progress(self, ready, total, done):
+        """更新音频加载进度提示"""
+        if not done:
+            self.progress_label.config(text=f"音频加载中 {ready}/{total}", fg='#1976D2')
         else:
-            bg_color = '#F5F5F5'
-            fg_color = '#333333'
+            self.progress_label.config(text=f"音频已就绪 {ready}/{total}" if total else "", fg='#666666')
         
-        # 创建内部框架（用于边框效果）
-        inner_frame = Frame(
-            button_frame,
-            bg=bg_color,
-            relief='raised',
-            bd=1
+    def create_keyboard(self):
+        """在单个 Canvas 上绘制键盘，每个按键由一个矩形和一个文字图形组成"""
+        self.canvas = Canvas(
+            self,
+            width=self.canvas_width,
+            height=self.canvas_height,
+            bg='#FFFFFF',
+            highlightthickness=0
         )
-        inner_frame.pack(fill='both', expand=True, padx=2, pady=2)
+        self.canvas.pack()
         
-        # 创建按键标签
-        button = Label(
-            inner_frame,
-            text=display_text,
+        gap = self.gap
+        y = 10
+        for row in self.keyboard_layout:
+            # 计算按键宽度，每行居中显示
+            widths = [int(self.base_width * width_multiplier) for _, width_multiplier in row]
+            row_width = sum(widths) + gap * len(row)
+            x = (self.canvas_width - row_width) / 2 + gap / 2
+            
+            for (key, _), width in zip(row, widths):
+                self.create_key_item(key, x, y, width, self.base_height)
+                x += width + gap
+            y += self.base_height + gap
+        
+        self.refresh_all()
+    
+    def create_key_item(self, key, x, y, width, height):
+        """创建单个按键的图形"""
+        rect = self.canvas.create_rectangle(
+            x + 2, y + 2, x + width - 2, y + height - 2,
+            outline=KEY_OUTLINE,
+            width=1
+        )
+        # 矩形和文字共用一个标签，点击任意一个都能响应
+        tag = f"key_{rect}"
+        self.canvas.addtag_withtag(tag, rect)
+        text = self.canvas.create_text(
+            x + width / 2, y + height / 2,
+            text=key,
             font=('Microsoft YaHei UI', 9, 'bold'),
-            bg=bg_color,
-            fg=fg_color,
-            relief='flat',
-            wraplength=width-8
+            width=width - 8,
+            justify='center',
+            tags=(tag,)
         )
-        button.pack(fill='both', expand=True)
+        self.key_items.setdefault(key, []).append((rect, text))
         
         # 添加点击效果
-        def on_press(e):
-            if not is_stop_key:
-                temp_color = '#1976D2' if is_bound else '#E0E0E0'
-                inner_frame.config(bg=temp_color)
-                button.config(bg=temp_color)
-        
-        def on_release(e):
-            if not is_stop_key:
-                # 根据按键当前状态恢复颜色
-                current_is_bound = key in self.player.key_sounds
-                if current_is_bound:
-                    restore_color = '#2196F3'  # 已绑定的蓝色
-                    restore_fg = '#FFFFFF'
-                else:
-                    restore_color = '#F5F5F5'  # 未绑定的灰色
-                    restore_fg = '#333333'
-                
-                inner_frame.config(bg=restore_color)
-                button.config(bg=restore_color, fg=restore_fg)
-        
-        # 绑定点击事件
-        if not is_stop_key:
-            button.bind('<Button-1>', lambda e: [on_press(e), self.on_key_click(key)])
-            button.bind('<ButtonRelease-1>', on_release)
-            inner_frame.bind('<Button-1>', lambda e: [on_press(e), self.on_key_click(key)])
-            inner_frame.bind('<ButtonRelease-1>', on_release)
-        else:
-            button.bind('<Button-1>', lambda e: self.show_stop_key_message())
-            inner_frame.bind('<Button-1>', lambda e: self.show_stop_key_message())
-        
-        return button_frame
+        self.canvas.tag_bind(tag, '<Button-1>', lambda e: self.on_item_press(key))
+        self.canvas.tag_bind(tag, '<ButtonRelease-1>', lambda e: self.on_item_release(key))
+    
+    def get_key_state(self, key):
+        """计算按键当前应显示的状态"""
+        if key.upper() == self.player.stop_key.upper():
+            return 'stop'
+        if key in self.player.key_sounds:
+            return 'bound'
+        return 'unbound'
+    
+    def render_key(self, key, state, fill=None):
+        """按状态更新按键图形，fill 用于临时覆盖背景色"""
+        bg_color, fg_color = KEY_COLORS[state]
+        display_text = f"{key}\n[停止键]" if state == 'stop' else key
+        for rect, text in self.key_items[key]:
+            self.canvas.itemconfigure(rect, fill=fill or bg_color)
+            self.canvas.itemconfigure(text, fill=fg_color, text=display_text)
+    
+    def on_item_press(self, key):
+        """处理按键图形的点击"""
+        state = self.key_states.get(key)
+        if state == 'stop':
+            self.show_stop_key_message()
+            return
+        for rect, _ in self.key_items[key]:
+            self.canvas.itemconfigure(rect, fill=KEY_PRESSED_COLORS[state])
+        self.on_key_click(key)
+        # 文件对话框或菜单是模态的，松开事件可能丢失，这里直接恢复颜色
+        self.update_keys([key], force=True)
+    
+    def on_item_release(self, key):
+        """松开鼠标后根据按键当前状态恢复颜色"""
+        if key in self.key_items:
+            self.update_keys([key], force=True)
+    
+    def flash_key(self, key):
+        """播放时闪烁按键，连续触发只延长闪烁时间，不会创建新的图形或定时器"""
+        if key not in self.key_items:
+            return
+        if key not in self.flashing:
+            for rect, _ in self.key_items[key]:
+                self.canvas.itemconfigure(rect, fill=FLASH_COLOR)
+        self.flashing[key] = self._now() + FLASH_DURATION
+        if not self.scheduler.is_pending('flash_end'):
+            self.scheduler.call_later('flash_end', FLASH_DURATION / 1000, self._end_flashes)
+    
+    def _end_flashes(self):
+        """恢复闪烁结束的按键，仍在闪烁的按键等待下一次检查"""
+        now = self._now()
+        expired = [key for key, ends in self.flashing.items() if ends <= now]
+        for key in expired:
+            del self.flashing[key]
+        self.update_keys(expired, force=True)
+        if self.flashing:
+            delay = max(1, min(self.flashing.values()) - now)
+            self.scheduler.call_later('flash_end', delay / 1000, self._end_flashes)
+    
+    def _now(self):
+        """当前时间（毫秒）"""
+        return time.monotonic() * 1000
     
     def on_key_click(self, key):
         """处理按键点击事件"""
@@ -197,6 +234,15 @@ class KeyboardUI(Frame):
         menu.add_separator()
         menu.add_command(label="更换音频", command=lambda: self.bind_new_sound(key))
         menu.add_command(label="删除绑定", command=lambda: self.remove_binding(key))
+        menu.add_separator()
+        # 长音频使用流式播放，不占用大量内存；未手动设置时按文件大小自动选择
+        self.stream_var = BooleanVar(value=self.player.is_streamed(key))
+        menu.add_checkbutton(label="流式播放（适合长音频）",
+                             variable=self.stream_var,
+                             command=lambda: self.player.set_key_stream(key, self.stream_var.get()))
+        if 'stream' in self.player.get_key_options(key):
+            menu.add_command(label="按文件大小自动选择播放方式",
+                             command=lambda: self.player.set_key_stream(key, None))
         
         # 在鼠标位置显示菜单
         menu.tk_popup(self.winfo_pointerx(), self.winfo_pointery())
@@ -211,50 +257,28 @@ class KeyboardUI(Frame):
         
         if file_path:
             self.player.add_sound(key, file_path)
-            self.refresh_all()  # 改回使用整体刷新
+            self.update_keys([key])
     
     def remove_binding(self, key):
         """删除按键绑定"""
         self.player.remove_sound(key)
-        self.refresh_all()  # 改回使用整体刷新
+        self.update_keys([key])
     
     def show_stop_key_message(self):
         """显示停止键提示信息"""
         messagebox.showinfo("提示", "此按键已被设置为停止键，不能绑定音频")
     
+    def update_keys(self, keys, force=False):
+        """只更新状态发生变化的按键"""
+        for key in keys:
+            if key not in self.key_items:
+                continue
+            state = self.get_key_state(key)
+            if force or self.key_states.get(key) != state:
+                self.key_states[key] = state
+                # 闪烁中的按键保持闪烁颜色，结束后再恢复
+                self.render_key(key, state, FLASH_COLOR if key in self.flashing else None)
+    
     def refresh_all(self):
-        """刷新所有按键的显示状态"""
-        # 遍历所有按键并更新状态
-        for widget in self.winfo_children():
-            for row_frame in widget.winfo_children():
-                for key_frame in row_frame.winfo_children():
-                    # 获取按键的组件
-                    inner_frame = key_frame.winfo_children()[0]
-                    button = inner_frame.winfo_children()[0]
-                    key = button.cget('text').split('\n')[0]  # 获取按键文本（去除可能的停止键标识）
-                    
-                    # 判断按键状态
-                    is_bound = key in self.player.key_sounds
-                    is_stop_key = key.upper() == self.player.stop_key.upper()
-                    
-                    # 设置按键颜色和显示文本
-                    if is_stop_key:
-                        bg_color = '#FF5252'
-                        fg_color = '#FFFFFF'
-                        display_text = f"{key}\n[停止键]"
-                    elif is_bound:
-                        bg_color = '#2196F3'
-                        fg_color = '#FFFFFF'
-                        display_text = key
-                    else:
-                        bg_color = '#F5F5F5'
-                        fg_color = '#333333'
-                        display_text = key
-                    
-                    # 更新按键外观
-                    inner_frame.config(bg=bg_color)
-                    button.config(
-                        bg=bg_color,
-                        fg=fg_color,
-                        text=display_text
-                    ) 
\ No newline at end of file
+        """刷新所有按键的显示状态，只重绘状态变化的按键"""
+        self.update_keys(self.key_items)
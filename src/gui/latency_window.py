@@ -0,0 +1,146 @@
+from tkinter import *
+from tkinter import ttk, messagebox, filedialog
+from ..core.latency import STAGES, STAGE_NAMES
+
+REFRESH_INTERVAL = 0.5  # 统计刷新间隔（秒）
+
+
+class LatencyWindow:
+    """按键延迟统计面板，定时刷新由主窗口的界面调度器执行"""
+
+    def __init__(self, parent, player, scheduler):
+        self.player = player
+        self.scheduler = scheduler
+        self.timer_name = f'latency_window_{id(self)}'  # 在调度器中登记的定时任务名称
+        self.window = Toplevel(parent)
+        self.window.title("延迟统计")
+        self.window.geometry("640x400")
+        self.window.configure(bg='#FFFFFF')
+        self.window.transient(parent)
+        # 面板打开时仍需处理按键，否则无法统计延迟
+        self.window.suspends_input = False
+
+        main_frame = Frame(self.window, bg='#FFFFFF', padx=30, pady=20)
+        main_frame.pack(fill='both', expand=True)
+
+        # 标题
+        Label(main_frame,
+              text="按键延迟统计（毫秒）",
+              font=('Microsoft YaHei UI', 14, 'bold'),
+              bg='#FFFFFF',
+              fg='#1565C0').pack(anchor='w', pady=(0, 10))
+
+        # 统计开关
+        self.enabled_var = BooleanVar(value=self.player.latency.enabled)
+        ttk.Checkbutton(main_frame,
+                        text="启用延迟统计",
+                        variable=self.enabled_var,
+                        command=self.on_toggle,
+                        style='Switch.TCheckbutton').pack(anchor='w', pady=(0, 10))
+
+        # 统计表格
+        columns = ('count', 'p50', 'p95', 'p99', 'max')
+        self.tree = ttk.Treeview(main_frame, columns=columns, height=3)
+        self.tree.heading('#0', text="阶段")
+        self.tree.column('#0', width=140)
+        for column, title in zip(columns, ("样本数", "p50", "p95", "p99", "最大")):
+            self.tree.heading(column, text=title)
+            self.tree.column(column, width=80, anchor='e')
+        for stage in STAGES:
+            self.tree.insert('', 'end', iid=stage, text=STAGE_NAMES[stage], values=('0',) * len(columns))
+        self.tree.pack(fill='x')
+
+        # 钩子层过滤掉的按键事件
+        self.input_label = Label(main_frame,
+                                 font=('Microsoft YaHei UI', 10),
+                                 bg='#FFFFFF',
+                                 fg='#666666')
+        self.input_label.pack(anchor='w', pady=(10, 0))
+
+        # 操作按钮
+        button_frame = Frame(main_frame, bg='#FFFFFF')
+        button_frame.pack(fill='x', pady=(15, 0))
+        for text, command in (("导出 CSV", self.export_csv),
+                              ("导出 JSON", self.export_json),
+                              ("重置", self.reset)):
+            Button(button_frame,
+                   text=text,
+                   command=command,
+                   font=('Microsoft YaHei UI', 10),
+                   bg='#2196F3',
+                   fg='white',
+                   relief='flat',
+                   cursor='hand2',
+                   padx=12,
+                   pady=4).pack(side='right', padx=5)
+
+        self.window.protocol("WM_DELETE_WINDOW", self.close)
+        # 随主窗口一起销毁时也要取消定时刷新
+        self.window.bind('<Destroy>', self.on_destroy)
+        self.refresh()
+
+    def refresh(self):
+        """刷新统计数据，仅在面板打开时定时执行"""
+        summary = self.player.latency.get_summary()
+        for stage in STAGES:
+            stats = summary[stage]
+            self.tree.item(stage, values=(
+                stats['count'],
+                f"{stats['p50']:.2f}",
+                f"{stats['p95']:.2f}",
+                f"{stats['p99']:.2f}",
+                f"{stats['max']:.2f}",
+            ))
+        input_stats = self.player.get_input_stats()
+        self.input_label.config(text=(
+            f"已处理按下 {input_stats['accepted']} 次，"
+            f"过滤自动重复 {input_stats['suppressed_repeats']} 次，"
+            f"过滤过快触发 {input_stats['suppressed_retriggers']} 次"
+        ))
+        self.scheduler.call_later(self.timer_name, REFRESH_INTERVAL, self.refresh)
+
+    def on_toggle(self):
+        """切换延迟统计"""
+        self.player.set_latency_tracking(self.enabled_var.get())
+
+    def reset(self):
+        """清空统计数据"""
+        self.player.latency.reset()
+
+    def export_csv(self):
+        """导出原始记录为 CSV"""
+        filepath = filedialog.asksaveasfilename(
+            parent=self.window,
+            title="导出延迟数据",
+            defaultextension=".csv",
+            filetypes=[("CSV 文件", "*.csv")]
+        )
+        if filepath:
+            try:
+                self.player.latency.export_csv(filepath)
+            except OSError as e:
+                messagebox.showerror("错误", f"导出延迟数据失败: {str(e)}", parent=self.window)
+
+    def export_json(self):
+        """导出统计摘要和原始记录为 JSON"""
+        filepath = filedialog.asksaveasfilename(
+            parent=self.window,
+            title="导出延迟数据",
+            defaultextension=".json",
+            filetypes=[("JSON 文件", "*.json")]
+        )
+        if filepath:
+            try:
+                self.player.latency.export_json(filepath)
+            except OSError as e:
+                messagebox.showerror("错误", f"导出延迟数据失败: {str(e)}", parent=self.window)
+
+    def close(self):
+        """关闭面板并停止刷新"""
+        self.scheduler.cancel(self.timer_name)
+        self.window.destroy()
+
+    def on_destroy(self, event):
+        """面板被销毁时取消定时刷新（子控件的销毁事件忽略）"""
+        if event.widget is self.window:
+            self.scheduler.cancel(self.timer_name)
@@ -1,14 +1,16 @@
 from tkinter import *
 from tkinter import ttk, messagebox, filedialog
-import pystray
-from PIL import Image, ImageTk
+import importlib
 import keyboard
+from ..core.events import EventBus
 from ..core.sound_player import SoundPlayer
+from ..utils.logger import logger
 from ..utils.resource import ResourceManager
-from .help_window import HelpWindow
+from ..utils.startup_profiler import StartupProfiler
 from .styles import configure_styles
 import os
 from .keyboard_ui import KeyboardUI
+from .status_presenter import StatusPresenter
 
 # 定义全局颜色变量
 COLORS = {
@@ -25,33 +27,44 @@ COLORS = {
 }
 
 class GUI:
-    def __init__(self):
-        self.root = Tk()
-        self.root.title("柠檬键音助手 BY Byclemon")
-        self.root.geometry("1200x800")
-        self.root.configure(bg='#FFFFFF')
-        
-        # 创建样式
-        self.style = ttk.Style()
-        
-        # 配置样式
-        configure_styles(self)
+    def __init__(self, profiler=None, on_quit=None):
+        # 启动分阶段进行：先显示窗口，音频、图标、托盘和帮助内容在窗口显示后再加载
+        self.profiler = profiler or StartupProfiler()
+        # 退出程序前的回调，进程随后会被强制结束
+        self.on_quit = on_quit
+        
+        with self.profiler.phase("创建窗口"):
+            self.root = Tk()
+            self.root.title("柠檬键音助手 BY Byclemon")
+            self.root.geometry("1200x800")
+            self.root.configure(bg='#FFFFFF')
+        
+        with self.profiler.phase("配置样式"):
+            # 创建样式
+            self.style = ttk.Style()
+            
+            # 配置样式
+            configure_styles(self)
         
-        # 创建播放器
-        self.player = SoundPlayer()
+        with self.profiler.phase("创建播放器"):
+            # 创建播放器，界面作为播放器事件的订阅者；音频在窗口显示后再加载
+            self.events = EventBus()
+            self.presenter = StatusPresenter(self, self.events)
+            self.player = SoundPlayer(self.events, autoload=False)
         
         # 初始化实例变量
         self.header_left = None
         self.stop_key_button = None
+        self.tray_icon = None
         
-        # 设置窗口图标
-        self.setup_window_icon()
-        
-        # 创建界面
-        self.create_widgets()
+        with self.profiler.phase("创建界面"):
+            # 创建界面
+            self.create_widgets()
+            self.presenter.start()
         
-        # 创建系统托盘图标
-        self.create_tray_icon()
+        # 对话框获得焦点时暂停处理按键
+        self.root.bind_all('<FocusIn>', self._on_focus_change, add='+')
+        self.root.bind_all('<FocusOut>', self._on_focus_change, add='+')
         
         # 绑定关闭事件
         self.root.protocol("WM_DELETE_WINDOW", self.on_closing)
@@ -59,33 +72,56 @@ class GUI:
         # 标记是否最小化到托盘
         self.minimized = False
     
+    def _run_deferred_startup(self, stages):
+        """窗口显示后逐个执行延迟的启动阶段，每个阶段之间让出事件循环保持界面响应"""
+        if not stages:
+            self.profiler.report()
+            return
+        name, stage = stages[0]
+        with self.profiler.phase(name):
+            stage()
+        self.root.after_idle(self._run_deferred_startup, stages[1:])
+    
+    def _start_tray_icon(self):
+        """创建并在后台运行系统托盘图标"""
+        self.create_tray_icon()
+        if self.tray_icon:
+            self.tray_icon.run_detached()
+    
+    def _preload_help(self):
+        """预先导入帮助窗口模块"""
+        importlib.import_module('.help_window', __package__)
+    
     def setup_window_icon(self):
         """设置窗口图标"""
         icon_path = ResourceManager.get_resource_path('logo.png')
         try:
+            from PIL import Image, ImageTk
             icon_image = Image.open(icon_path)
             icon = ImageTk.PhotoImage(icon_image)
             self.root.iconphoto(True, icon)
             self.icon_image = icon_image  # 保存引用防止被回收
         except Exception as e:
-            print(f"[DEBUG] 加载图标失败: {e}")
+            logger.warning("加载图标失败: %s", e)
     
     def create_tray_icon(self):
         """创建系统托盘图标"""
         try:
+            import pystray
+            from PIL import Image
             # 获取图标文件路径
             icon_path = ResourceManager.get_resource_path('logo.png')
             image = Image.open(icon_path)
             
             def on_left_click(icon, item):
-                print("[DEBUG] 托盘图标被点击")
+                logger.debug("托盘图标被点击")
                 self.show_window()
             
             menu = (
                 pystray.MenuItem("显示主窗口", self.show_window, default=True),  # 设置为默认动作
                 pystray.MenuItem("退出程序", self.quit_app)
             )
-            print("[DEBUG] 创建托盘图标")
+            logger.debug("创建托盘图标")
             self.tray_icon = pystray.Icon(
                 "柠檬键音助手",
                 image,
@@ -93,13 +129,13 @@ class GUI:
                 menu
             )
         except Exception as e:
-            print(f"[DEBUG] 加载托盘图标失败: {e}")
+            logger.warning("加载托盘图标失败: %s", e)
             self.tray_icon = None
     
     def show_window(self, icon=None, item=None):
-        print(f"[DEBUG] show_window 被调用: icon={icon}, item={item}")
+        logger.debug("show_window 被调用: icon=%s, item=%s", icon, item)
         def do_show():
-            print("[DEBUG] 开始显示窗口")
+            logger.debug("开始显示窗口")
             self.root.deiconify()
             self.root.state('normal')
             self.root.lift()
@@ -108,27 +144,33 @@ class GUI:
             self.root.update()
             self.root.attributes('-topmost', False)
             self.minimized = False
-            print("[DEBUG] 窗口显示完成")
+            logger.debug("窗口显示完成")
         
         if icon:
-            print("[DEBUG] 通过托盘图标调用，使用 after")
+            logger.debug("通过托盘图标调用，使用 after")
             self.root.after(0, do_show)
         else:
-            print("[DEBUG] 直接调用显示窗口")
+            logger.debug("直接调用显示窗口")
             do_show()
     
     def hide_window(self):
-        print("[DEBUG] 开始隐藏窗口")
+        logger.debug("开始隐藏窗口")
+        if not self.tray_icon:
+            # 托盘图标不可用时只最小化窗口，避免窗口无法恢复
+            self.root.iconify()
+            return
         self.minimized = True
         self.root.withdraw()
         if not self.tray_icon.visible:
-            print("[DEBUG] 托盘图标不可见，启动托盘图标")
+            logger.debug("托盘图标不可见，启动托盘图标")
             self.tray_icon.run()
-        print("[DEBUG] 窗口隐藏完成")
+        logger.debug("窗口隐藏完成")
     
     def on_closing(self):
         # 直接最小化到托盘，不再询问
         self.hide_window()
+        if not self.tray_icon:
+            return
         # 显示提示信息
         self.tray_icon.notify(
             "程序已最小化到系统托盘",
@@ -136,16 +178,17 @@ class GUI:
         )
     
     def quit_app(self, icon=None, item=None):
-        # 停止播放器
-        if self.player.is_running:
-            if self.player.keyboard_listener:
-                keyboard.unhook(self.player.keyboard_listener)
-            if self.player.keyboard_release_listener:
-                keyboard.unhook(self.player.keyboard_release_listener)
-            self.player.stop_sound()
+        # 停止播放器并写入尚未保存的配置
+        self.player.shutdown()
+        
+        if self.on_quit:
+            try:
+                self.on_quit()
+            except Exception:
+                logger.exception("执行退出回调失败")
         
         # 停止托盘图标
-        if hasattr(self, 'tray_icon'):
+        if self.tray_icon:
             try:
                 self.tray_icon.stop()
             except:
@@ -162,15 +205,43 @@ class GUI:
             os._exit(0)  # 强制退出程序
     
     def run(self):
-        print("[DEBUG] 程序开始运行")
-        print("[DEBUG] 启动托盘图标")
-        self.tray_icon.run_detached()
-        print("[DEBUG] 运行主窗口")
+        logger.debug("程序开始运行")
+        with self.profiler.phase("显示窗口"):
+            self.root.update()
+        
+        # 窗口已显示，后台依次完成剩余的启动工作
+        self._run_deferred_startup([
+            ("加载音频", self.player.load_sounds),
+            ("设置窗口图标", self.setup_window_icon),
+            ("创建托盘图标", self._start_tray_icon),
+            ("加载帮助内容", self._preload_help),
+        ])
+        logger.debug("运行主窗口")
         self.root.mainloop()
 
+    def _on_focus_change(self, event):
+        """根据当前焦点所在窗口更新播放器的按键处理状态"""
+        try:
+            focus = self.root.focus_get()
+        except (KeyError, TclError):
+            focus = None
+        if focus is None:
+            self.player.input_suspended = False
+            return
+        toplevel = focus.winfo_toplevel()
+        # 对话框打开时暂停处理按键，标记了 suspends_input = False 的窗口除外
+        self.player.input_suspended = (toplevel is not self.root
+                                       and getattr(toplevel, 'suspends_input', True))
+
     def show_help(self):
         """显示帮助窗口"""
+        from .help_window import HelpWindow
         HelpWindow(self.root)
+
+    def show_latency(self):
+        """显示延迟统计面板"""
+        from .latency_window import LatencyWindow
+        LatencyWindow(self.root, self.player, self.presenter.scheduler)
     
     def add_new_sound(self):
         """添加新的按键绑定"""
@@ -259,6 +330,17 @@ class GUI:
         dialog.protocol("WM_DELETE_WINDOW", on_dialog_close)
         dialog.wait_window()
     
+    def import_folder(self):
+        """从文件夹批量导入按键绑定"""
+        if self.player.is_running:
+            messagebox.showinfo("提示", "请先停止监听，再添加按键绑定")
+            return
+        folder = filedialog.askdirectory(title="选择音频文件夹（文件名为按键名称，或包含 keymap.json）")
+        if folder:
+            # 导入完成后收到 BindingsImported 事件时统一刷新
+            self.status_label.config(text="正在批量导入...")
+            self.player.import_folder(folder)
+    
     def update_binding_list(self):
         """更新绑定显示"""
         if hasattr(self, 'keyboard_ui'):
@@ -338,6 +420,18 @@ class GUI:
                padx=15,
                pady=8).pack(side='right')
         
+        # 延迟统计按钮
+        Button(title_frame,
+               text="延迟统计",
+               command=self.show_latency,
+               font=('Microsoft YaHei UI', 11),
+               bg='#E8EAF6',
+               fg='#3F51B5',
+               relief='flat',
+               cursor='hand2',
+               padx=15,
+               pady=8).pack(side='right', padx=(0, 10))
+        
         # 状态和控制区域
         self.control_container = Frame(self.main_frame, bg='#FFFFFF')
         self.control_container.pack(fill='x', pady=(0, 30), padx=30)
@@ -416,6 +510,18 @@ class GUI:
                                      pady=5)
         self.stop_key_button.pack(side='right', padx=5)
         
+        # 批量导入按钮
+        Button(button_frame,
+               text="批量导入",
+               command=self.import_folder,
+               font=('Microsoft YaHei UI', 11),
+               bg=COLORS['primary'],
+               fg='white',
+               relief='flat',
+               cursor='hand2',
+               padx=15,
+               pady=5).pack(side='right', padx=5)
+        
         # 添加绑定按钮
         Button(button_frame,
                text="添加绑定",
@@ -447,6 +553,7 @@ class GUI:
         self.keyboard_ui = KeyboardUI(
             keyboard_container,
             self.player,
+            self.presenter.scheduler,
             bg=COLORS['bg_white']
         )
         self.keyboard_ui.place(relx=0.5, rely=0.5, anchor='center')  # 使用place布局居中显示
@@ -454,9 +561,6 @@ class GUI:
         # 不在这里调用 update_binding_list
         # self.update_binding_list()
         
-        # 设置 GUI 元素引用
-        self.player.set_gui_elements(self.status_label, self.start_button, self)
-        
         # 启动按钮样式
         self.start_button.config(
             bg=COLORS['primary'],
@@ -524,8 +628,7 @@ class GUI:
                 return
             
             # 更新停止键
-            self.player.stop_key = key
-            self.player.save_config()
+            self.player.set_stop_key(key)
             
             # 更新按钮文字
             self.stop_key_button.config(text=f"停止键：{key}")
@@ -619,6 +722,7 @@ class GUI:
             ("删除场景", self.delete_scene),
             ("导入配置", self.import_scene),
             ("导出配置", self.export_scene),
+            ("导入音效包", self.import_scene_pack),
         ]
         
         for text, command in buttons:
@@ -654,6 +758,8 @@ class GUI:
         # 清除所有现有标签页
         for widget in self.scene_tabs.winfo_children():
             widget.destroy()
+        self.scene_tab_widgets = {}
+        self.scene_tabs_signature = self.get_scene_tabs_signature()
         
         # 创建标签页容器
         tabs_frame = Frame(self.scene_tabs, bg=COLORS['bg_white'])
@@ -664,51 +770,93 @@ class GUI:
             tab = Frame(tabs_frame, bg=COLORS['bg_white'], cursor='hand2')
             tab.pack(side='left', padx=4)  # 增加标签间距
             
-            # 判断是否是当前场景
-            is_current = scene_id == self.player.current_scene
+            # 常驻场景在名称后显示标记
+            text = scene_data['name']
+            if scene_data.get('hot'):
+                text += " ★"
             
             # 标签页按钮
             btn = Label(tab,
-                       text=scene_data['name'],
+                       text=text,
                        font=('Microsoft YaHei UI', 11),
-                       bg=COLORS['primary_light'] if is_current else COLORS['bg_white'],
-                       fg=COLORS['primary'] if is_current else COLORS['text_secondary'],
                        padx=20,  # 增加水平内边距
                        pady=10)  # 增加垂直内边距
             btn.pack(fill='both')
             
             # 底部指示条
-            indicator = Frame(tab,
-                             bg=COLORS['primary'] if is_current else COLORS['bg_white'],
-                             height=3)  # 增加指示条高度
+            indicator = Frame(tab, height=3)  # 增加指示条高度
             indicator.pack(fill='x')
+            self.scene_tab_widgets[scene_id] = (btn, indicator)
             
             # 绑定点击事件
             def make_callback(sid):
                 return lambda e: self.on_scene_change(sid)
             
             btn.bind('<Button-1>', make_callback(scene_id))
+            btn.bind('<Button-3>', lambda e, sid=scene_id: self.show_scene_menu(sid))
             
-            # 绑定鼠标悬停效果
-            def on_enter(e, ind, is_current):
-                if not is_current:
+            # 绑定鼠标悬停效果，是否为当前场景在事件发生时判断
+            def on_enter(e, ind, sid):
+                if sid != self.player.current_scene:
                     e.widget.config(bg='#F5F5F5')
                     ind.config(bg=COLORS['primary_light'])  # 使用浅色指示条
             
-            def on_leave(e, ind, is_current):
-                if not is_current:
+            def on_leave(e, ind, sid):
+                if sid != self.player.current_scene:
                     e.widget.config(bg=COLORS['bg_white'])
                     ind.config(bg=COLORS['bg_white'])
             
-            if not is_current:
-                btn.bind('<Enter>', lambda e, i=indicator: on_enter(e, i, is_current))
-                btn.bind('<Leave>', lambda e, i=indicator: on_leave(e, i, is_current))
+            btn.bind('<Enter>', lambda e, i=indicator, sid=scene_id: on_enter(e, i, sid))
+            btn.bind('<Leave>', lambda e, i=indicator, sid=scene_id: on_leave(e, i, sid))
+        
+        self.highlight_scene_tab()
+
+    def get_scene_tabs_signature(self):
+        """场景标签的显示内容，不变时切换场景只需更新高亮"""
+        return [(scene_id, scene_data['name'], bool(scene_data.get('hot')))
+                for scene_id, scene_data in self.player.scenes.items()]
+
+    def highlight_scene_tab(self):
+        """高亮当前场景的标签"""
+        for scene_id, (btn, indicator) in self.scene_tab_widgets.items():
+            is_current = scene_id == self.player.current_scene
+            btn.config(bg=COLORS['primary_light'] if is_current else COLORS['bg_white'],
+                       fg=COLORS['primary'] if is_current else COLORS['text_secondary'])
+            indicator.config(bg=COLORS['primary'] if is_current else COLORS['bg_white'])
 
     def on_scene_change(self, scene_id):
         """处理场景切换"""
-        if self.player.switch_scene(scene_id):
-            self.update_binding_list()
-            self.update_scene_tabs()  # 更新标签页显示
+        # 界面在收到场景切换事件后统一刷新
+        self.player.switch_scene(scene_id)
+
+    def show_scene_menu(self, scene_id):
+        """显示场景标签的右键菜单"""
+        menu = Menu(self.root, tearoff=0)
+        if self.player.is_hot_scene(scene_id):
+            menu.add_command(label="取消常驻", command=lambda: self.set_scene_hot(scene_id, False))
+        else:
+            menu.add_command(label="设为常驻（音频保留在内存中）",
+                             command=lambda: self.set_scene_hot(scene_id, True))
+        menu.add_separator()
+        menu.add_command(label="导出音效包", command=lambda: self.export_scene_pack(scene_id))
+        menu.add_command(label="导出音效包（预解码，加载更快）",
+                         command=lambda: self.export_scene_pack(scene_id, predecoded=True))
+        menu.tk_popup(self.root.winfo_pointerx(), self.root.winfo_pointery())
+
+    def set_scene_hot(self, scene_id, hot):
+        """标记或取消常驻场景"""
+        if self.player.set_scene_hot(scene_id, hot):
+            self.update_scene_tabs()
+
+    def on_player_scene_switched(self):
+        """播放器场景变化后刷新界面"""
+        # 只切换了场景时不重建标签页
+        if self.get_scene_tabs_signature() == self.scene_tabs_signature:
+            self.highlight_scene_tab()
+        else:
+            self.update_scene_tabs()
+        self.update_binding_list()
+        self.stop_key_button.config(text=f"停止键：{self.player.stop_key}")
 
     def create_new_scene(self):
         """创建新场景"""
@@ -777,13 +925,8 @@ class GUI:
         def on_confirm():
             name = name_entry.get().strip()
             if name and name != "请输入场景名称":
-                scene_id = f"scene_{len(self.player.scenes)}"
-                while scene_id in self.player.scenes:
-                    scene_id = f"scene_{int(scene_id.split('_')[1]) + 1}"
-                
+                scene_id = self.player.new_scene_id()
                 if self.player.add_scene(scene_id, name):
-                    self.update_scene_tabs()
-                    self.update_binding_list()
                     dialog.destroy()
             else:
                 messagebox.showwarning("提示", "请输入场景名称")
@@ -831,13 +974,8 @@ class GUI:
             filetypes=[("配置文件", "*.json")]
         )
         if filepath:
+            # 场景标签页、按键绑定和停止键显示在收到场景切换事件后刷新
             if self.player.import_config(filepath):
-                # 更新场景标签页
-                self.update_scene_tabs()
-                # 更新按键绑定列表
-                self.update_binding_list()
-                # 更新停止键显示
-                self.stop_key_button.config(text=f"停止键：{self.player.stop_key}")
                 messagebox.showinfo("成功", "配置导入成功")
 
     def export_scene(self):
@@ -851,6 +989,28 @@ class GUI:
             if self.player.export_config(filepath):
                 messagebox.showinfo("成功", "配置导出成功")
 
+    def import_scene_pack(self):
+        """导入音效包"""
+        filepath = filedialog.askopenfilename(
+            title="导入音效包",
+            filetypes=[("音效包", "*.lkpack")]
+        )
+        if filepath:
+            # 导入后自动切换到新场景，标签页在收到场景切换事件后刷新
+            self.player.import_scene_pack(filepath)
+
+    def export_scene_pack(self, scene_id, predecoded=False):
+        """把场景及其音频导出为音效包"""
+        filepath = filedialog.asksaveasfilename(
+            title="导出音效包",
+            initialfile=self.player.scenes[scene_id]['name'],
+            defaultextension=".lkpack",
+            filetypes=[("音效包", "*.lkpack")]
+        )
+        if filepath:
+            if self.player.export_scene_pack(scene_id, filepath, predecoded):
+                messagebox.showinfo("成功", "音效包导出成功")
+
     def delete_scene(self):
         """删除当前场景"""
         current_scene = self.player.current_scene
@@ -858,10 +1018,8 @@ class GUI:
         
         # 确认删除
         if messagebox.askyesno("确认删除", f"确定要删除场景「{scene_name}」吗？\n删除后无法恢复。"):
-            if self.player.remove_scene(current_scene):
-                # 更新场景标签页和按键绑定列表
-                self.update_scene_tabs()
-                self.update_binding_list()
+            # 场景标签页和按键绑定列表在收到场景切换事件后刷新
+            self.player.remove_scene(current_scene)
 
     def _on_canvas_configure(self, event):
         """处理画布大小变化"""
@@ -0,0 +1,128 @@
+from collections import deque
+from tkinter import messagebox
+from ..core.events import (SoundPlayed, SoundStopped, KeyUnbound, LoadProgress, LoadError,
+                           SceneSwitched, RunningChanged, Message, BindingsDecoded,
+                           BindingsImported)
+
+from .ui_scheduler import UIScheduler
+
+STATUS_RESTORE_DELAY = 2.0  # 按键提示显示多久后恢复运行状态（秒）
+
+
+class StatusPresenter:
+    """播放器事件的界面订阅者
+
+    播放器在分发线程和加载线程中发布事件，这里只把事件放进队列，
+    由界面调度器在 Tk 主线程中每帧统一取出并合并，每帧最多刷新一次界面。
+    后台线程批量解码完成的按键绑定也在这里交回播放器，在 Tk 主线程中提交。
+    恢复运行状态提示只有一个定时任务，新的提示只会推迟它。
+    """
+
+    EVENT_TYPES = (SoundPlayed, SoundStopped, KeyUnbound, LoadProgress, LoadError,
+                   SceneSwitched, RunningChanged, Message, BindingsDecoded, BindingsImported)
+
+    def __init__(self, gui, events):
+        self.gui = gui
+        self._pending = deque()     # deque 的 append/popleft 是线程安全的
+        self.scheduler = UIScheduler(gui.root)
+        self.scheduler.add_source(self._has_pending, self._apply_pending)
+        for event_type in self.EVENT_TYPES:
+            events.subscribe(event_type, self._pending.append)
+
+    def start(self):
+        """界面创建完成后开始处理事件"""
+        self.scheduler.start()
+
+    def _has_pending(self):
+        return bool(self._pending)
+
+    def _restore_status(self):
+        self.gui.status_label.config(text=self._running_text())
+
+    def _running_text(self):
+        return "正在运行" if self.gui.player.is_running else "已停止"
+
+    def _apply_pending(self):
+        """合并本帧内的所有事件后统一刷新界面"""
+        status = None
+        running = None
+        progress = None
+        scene_changed = False
+        load_errors = []
+        messages = []
+        played_keys = set()
+        bindings_changed = False
+        import_issues = []
+        decoded = []
+
+        while self._pending:
+            event = self._pending.popleft()
+            if isinstance(event, SoundPlayed):
+                status = f"播放按键 {event.key} 的音频"
+                played_keys.add(event.key)
+            elif isinstance(event, KeyUnbound):
+                status = f"按键 {event.key} 未绑定音频"
+            elif isinstance(event, SoundStopped):
+                status = "停止播放"
+            elif isinstance(event, RunningChanged):
+                running = event.is_running
+                status = None
+            elif isinstance(event, LoadProgress):
+                progress = event
+            elif isinstance(event, LoadError):
+                load_errors.extend(event.errors)
+            elif isinstance(event, SceneSwitched):
+                scene_changed = True
+            elif isinstance(event, Message):
+                messages.append(event)
+            elif isinstance(event, BindingsDecoded):
+                decoded.append(event)
+            elif isinstance(event, BindingsImported):
+                bindings_changed = True
+                status = f"已导入 {len(event.keys)} 个按键绑定"
+                import_issues.extend(event.issues)
+
+        # 提交后发布的 BindingsImported 事件在下一帧刷新界面
+        for event in decoded:
+            self.gui.player.finish_import(event)
+
+        if running is not None:
+            self.scheduler.cancel('restore_status')
+            self.gui.status_label.config(text="正在运行" if running else "已停止")
+            if running:
+                self.gui.start_button.config(text="停止监听", bg='#f44336')
+            else:
+                self.gui.start_button.config(text="启动监听", bg='#4CAF50')
+
+        if status is not None:
+            self.gui.status_label.config(text=status)
+            self.scheduler.call_later('restore_status', STATUS_RESTORE_DELAY, self._restore_status)
+
+        if scene_changed:
+            self.gui.on_player_scene_switched()
+        elif bindings_changed:
+            self.gui.update_binding_list()
+
+        for key in played_keys:
+            self.gui.keyboard_ui.flash_key(key)
+
+        if progress is not None:
+            self.gui.keyboard_ui.set_load_progress(progress.ready, progress.total, progress.done)
+
+        for message in messages:
+            if message.kind == 'error':
+                messagebox.showerror(message.title, message.text)
+            elif message.kind == 'warning':
+                messagebox.showwarning(message.title, message.text)
+            else:
+                messagebox.showinfo(message.title, message.text)
+
+        if import_issues:
+            details = "\n".join(import_issues[:20])
+            if len(import_issues) > 20:
+                details += f"\n……另有 {len(import_issues) - 20} 项"
+            messagebox.showwarning("批量导入", f"以下文件未能导入:\n{details}")
+
+        if load_errors:
+            details = "\n".join(f"{path}: {error}" for path, error in load_errors)
+            messagebox.showwarning("警告", f"以下音频文件加载失败:\n{details}")
@@ -0,0 +1,98 @@
+import time
+
+FRAME_INTERVAL = 16     # 两帧之间的最短间隔（毫秒），约 60 帧每秒
+IDLE_INTERVAL = 50      # 空闲时检查其他线程事件的间隔（毫秒）
+ACTIVE_PERIOD = 1.0     # 最近一次刷新后按帧率检查的时长（秒）
+
+
+class UIScheduler:
+    """Tk 主线程中的界面刷新调度器
+
+    所有界面刷新共用一个 Tk 定时器，任何时候最多只有一个待执行的 after 任务。
+    其他线程的事件由数据源（是否有待处理内容, 刷新函数）提供，调度器每帧检查一次，
+    有内容时在同一帧内统一刷新；按名称登记的定时任务（例如恢复状态提示）再次登记时改期而不是重复创建，
+    到期后也在帧内执行。两帧之间至少间隔 FRAME_INTERVAL，每帧最多刷新一次界面。
+    最近有刷新时按帧率检查，空闲一段时间后降低检查频率。
+    """
+
+    def __init__(self, root, frame_interval=FRAME_INTERVAL, idle_interval=IDLE_INTERVAL):
+        self.root = root
+        self.frame_interval = frame_interval / 1000
+        self.idle_interval = idle_interval / 1000
+        self._sources = []          # (是否有待处理内容, 刷新函数)
+        self._timers = {}           # 名称 -> (到期时间, 回调)
+        self._job = None            # 当前的 Tk 定时器
+        self._job_at = None         # 当前定时器的触发时间
+        self._last_frame = float('-inf')
+        self._last_activity = float('-inf')
+        self._started = False
+        self.frames = 0             # 刷新了界面的帧数
+        self.wakeups = 0            # 定时器触发次数
+
+    def add_source(self, has_pending, flush):
+        """登记一个数据源，has_pending 可以在任意线程的数据上调用，flush 在主线程中刷新界面"""
+        self._sources.append((has_pending, flush))
+
+    def start(self):
+        """界面创建完成后开始调度"""
+        if not self._started:
+            self._started = True
+            self._schedule()
+
+    def call_later(self, name, delay, callback):
+        """delay 秒后在帧内执行 callback，同名任务已存在时改期"""
+        self._timers[name] = (time.monotonic() + delay, callback)
+        self._schedule()
+
+    def cancel(self, name):
+        """取消定时任务"""
+        self._timers.pop(name, None)
+
+    def is_pending(self, name):
+        """定时任务是否尚未执行"""
+        return name in self._timers
+
+    def _schedule(self):
+        """根据最近的到期时间调整唯一的 Tk 定时器"""
+        if not self._started:
+            return
+        now = time.monotonic()
+        poll = self.frame_interval if now - self._last_activity < ACTIVE_PERIOD else self.idle_interval
+        wake = now + poll
+        for deadline, _ in self._timers.values():
+            if deadline < wake:
+                wake = deadline
+        wake = max(wake, self._last_frame + self.frame_interval)
+        if self._job is not None:
+            if self._job_at <= wake:
+                return
+            self.root.after_cancel(self._job)
+        self._job_at = wake
+        self._job = self.root.after(max(1, int((wake - now) * 1000)), self._run)
+
+    def _run(self):
+        self._job = None
+        self.wakeups += 1
+        now = time.monotonic()
+        flushed = False
+        for has_pending, flush in self._sources:
+            if has_pending():
+                flush()
+                flushed = True
+        due = [name for name, (deadline, _) in self._timers.items() if deadline <= now]
+        for name in due:
+            _, callback = self._timers.pop(name)
+            callback()
+        if flushed or due:
+            self._last_frame = now
+            self._last_activity = now
+            self.frames += 1
+        self._schedule()
+
+    def get_stats(self):
+        """获取调度统计信息"""
+        return {
+            'frames': self.frames,
+            'wakeups': self.wakeups,
+            'timers': len(self._timers),
+        }
@@ -0,0 +1,21 @@
+import logging
+import sys
+
+LOG_LEVELS = ('debug', 'info', 'warning', 'error')
+
+# 所有模块共用的日志记录器，默认只输出警告及以上级别
+logger = logging.getLogger('lemon_key_sound')
+logger.setLevel(logging.WARNING)
+logger.addHandler(logging.NullHandler())
+
+
+def setup_logging(level='warning'):
+    """设置日志级别并输出到标准错误
+
+    热路径上的日志使用 logger.debug("... %s", 参数) 的形式，
+    级别未开启时不会格式化字符串，开销只有一次级别判断。
+    """
+    handler = logging.StreamHandler(sys.stderr)
+    handler.setFormatter(logging.Formatter('[%(levelname)s] %(threadName)s: %(message)s'))
+    logger.addHandler(handler)
+    logger.setLevel(getattr(logging, level.upper(), logging.WARNING))
@@ -0,0 +1,41 @@
+import sys
+import time
+from contextlib import contextmanager
+
+
+class StartupProfiler:
+    """记录启动过程中各阶段的耗时，用于 --profile-startup"""
+
+    def __init__(self, enabled=False, started=None):
+        self.enabled = enabled
+        self.started = started if started is not None else time.perf_counter()
+        self.phases = []            # (阶段名称, 开始时间, 耗时)，时间相对于启动时刻
+        self._reported = False
+
+    @contextmanager
+    def phase(self, name):
+        """统计一个阶段的耗时"""
+        if not self.enabled:
+            yield
+            return
+        begin = time.perf_counter()
+        try:
+            yield
+        finally:
+            end = time.perf_counter()
+            self.phases.append((name, begin - self.started, end - begin))
+
+    def elapsed(self):
+        """距离启动的总耗时（秒）"""
+        return time.perf_counter() - self.started
+
+    def report(self, file=None):
+        """输出各阶段耗时，只输出一次"""
+        if not self.enabled or self._reported:
+            return
+        self._reported = True
+        file = file or sys.stderr
+        print("启动耗时分析:", file=file)
+        for name, offset, duration in self.phases:
+            print(f"  {offset * 1000:8.1f} ms  +{duration * 1000:7.1f} ms  {name}", file=file)
+        print(f"  总耗时 {self.elapsed() * 1000:.1f} ms", file=file)